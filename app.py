@@ -1,14 +1,23 @@
 import os
 
 from flask import Flask
+from services import data_store, upload_store
 from views.base_view import base_bp
-from views.discover_view import discover_bp
+from views.discover_view import UploadRequest, discover_bp
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
+# 上传：请求体超过 MAX_CONTENT_LENGTH 直接 413；文件流边收边写盘（见 UploadRequest）
+app.config["MAX_CONTENT_LENGTH"] = upload_store.MAX_CONTENT_LENGTH
+app.request_class = UploadRequest
+
 # 注册蓝图
 app.register_blueprint(base_bp)
 app.register_blueprint(discover_bp)
 
+# 数据文件热更新：后台轮询 data/*.json 的 mtime/size，并在启动时预热派生结构
+# （DATA_WATCH_INTERVAL=0 时不轮询，只预热一次）
+data_store.start_watcher()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", 8000)), debug=True)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成数据：把 data/ 下的 relation_*.json / rank_table_*.json 复制 k 份，
+每份的节点 id 加后缀 `~{i}`，从而得到结构相同、规模放大 k 倍的数据目录。
+"""
+from __future__ import annotations
+import glob, json, os, sys
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _load(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sid(v: Any, i: int) -> Any:
+    return f"{v}~{i}" if (v and i) else v
+
+
+def scale_relation(rel: Dict[str, Any], k: int) -> Dict[str, Any]:
+    nodes: List[Dict[str, Any]] = []
+    edges: List[Dict[str, Any]] = []
+    for i in range(k):
+        for n in rel.get("nodes") or []:
+            nodes.append({**n, "id": _sid(n.get("id"), i), "name": _sid(n.get("name"), i)})
+        for e in rel.get("edges") or []:
+            edges.append({**e, "source": _sid(e.get("source"), i), "target": _sid(e.get("target"), i)})
+    return {"nodes": nodes, "edges": edges}
+
+
+def scale_rank(rows: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+    return [{**r, "id": _sid(r.get("id"), i), "name": _sid(r.get("name"), i)}
+            for i in range(k) for r in rows]
+
+
+def write_scaled(out_dir: str, k: int) -> Dict[str, int]:
+    """写出放大 k 倍的数据目录，返回 {relation_nodes, relation_edges, rank_rows} 计数。"""
+    os.makedirs(out_dir, exist_ok=True)
+    stats = {"relation_nodes": 0, "relation_edges": 0, "rank_rows": 0}
+    for fp in sorted(glob.glob(os.path.join(DATA_DIR, "relation_*.json"))):
+        rel = scale_relation(_load(fp), k)
+        stats["relation_nodes"] += len(rel["nodes"])
+        stats["relation_edges"] += len(rel["edges"])
+        with open(os.path.join(out_dir, os.path.basename(fp)), "w", encoding="utf-8") as f:
+            json.dump(rel, f, ensure_ascii=False)
+    for fp in sorted(glob.glob(os.path.join(DATA_DIR, "rank_table_*.json"))):
+        rows = scale_rank(_load(fp), k)
+        stats["rank_rows"] += len(rows)
+        with open(os.path.join(out_dir, os.path.basename(fp)), "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False)
+    return stats
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+graph_repo.build_items_from_graphs 冷构建耗时。
+
+    python benchmarks/bench_build_items.py --scales 1 4 16 64
+
+每个规模都把 data/ 放大后写入临时目录，只计 build_items_from_graphs 本身
+（JSON 解析已由 data_store 预热）。构建是线性的话，“每行耗时”应基本不随规模变化。
+incr 列是只有一个领域（video）变化时的增量重建：其余领域分区直接沿用。
+"""
+from __future__ import annotations
+import argparse, os, tempfile, time
+
+from _synth import write_scaled
+
+from services import data_store, graph_repo
+
+
+def bench(k: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = write_scaled(tmp, k)
+        data_store.RELATION_GLOB = os.path.join(tmp, "relation_*.json")
+        data_store.RANK_GLOB = os.path.join(tmp, "rank_table_*.json")
+        data_store.invalidate()
+        store = data_store.get_store()
+
+        def fresh():
+            # 同样的已解析文件、空的派生缓存
+            return data_store.build_store(list(store.relations + store.ranks), dict(store.sigs))
+
+        best = incr = float("inf")
+        for _ in range(repeat):
+            st = fresh()
+            t0 = time.perf_counter()
+            items = graph_repo._build_items(st)
+            best = min(best, time.perf_counter() - t0)
+
+            st2 = fresh()
+            data_store._inherit_memo(st2, st, {"video"})
+            t0 = time.perf_counter()
+            graph_repo._build_items(st2)
+            incr = min(incr, time.perf_counter() - t0)
+
+    rows = stats["relation_nodes"] + stats["rank_rows"]
+    print(f"x{k:<4} nodes={stats['relation_nodes']:<7} rank_rows={stats['rank_rows']:<7} "
+          f"items={len(items):<7} build={best * 1e3:9.1f} ms  per_row={best / rows * 1e6:6.2f} us  "
+          f"incr={incr * 1e3:8.1f} ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    for k in args.scales:
+        bench(k, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
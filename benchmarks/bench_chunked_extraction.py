@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+长文档抽取：整篇一次调用 vs 分块并发调用（本地假模型，不访问网络）。
+
+    python benchmarks/bench_chunked_extraction.py --chars 20000 60000 --ms-per-kchar 40
+
+假模型的耗时 = 固定开销 + 与输入长度成正比的部分，近似真实接口的生成/预填充耗时；
+抽取缓存指向临时目录，每轮都会真实“调用”假模型。
+"""
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time, types
+
+from _synth import ROOT_DIR  # noqa: F401  (设置 sys.path)
+
+os.environ["LLM_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="llm_cache_"), "cache.db")
+
+import services.intelligent_discovery  # noqa: E402
+from services.text_chunker import split_text  # noqa: E402
+
+idm = sys.modules["services.intelligent_discovery"]
+
+_WORDS = ["深度学习", "扩散模型", "图像生成", "强化学习", "脑机接口", "PyTorch", "Sora", "ChatGPT"]
+
+
+def make_doc(n_chars: int) -> str:
+    paras, i = [], 0
+    while sum(len(p) for p in paras) < n_chars:
+        w = _WORDS[i % len(_WORDS)]
+        paras.append(f"第{i}段：本段讨论{w}在工业场景中的应用。" + "相关实验表明该方法具有较好的效果。" * 12)
+        i += 1
+    return "\n\n".join(paras)
+
+
+def fake_call_factory(base_ms: float, ms_per_kchar: float):
+    def fake_call(**kw):
+        text = kw["messages"][1]["content"]
+        time.sleep((base_ms + ms_per_kchar * len(text) / 1000.0) / 1000.0)
+        found = [w for w in _WORDS if w in text]
+        out = {"all_tech_words": [w for w in found if not w.isascii()],
+               "all_product_words": [w for w in found if w.isascii()]}
+        msg = types.SimpleNamespace(content=json.dumps(out, ensure_ascii=False))
+        return types.SimpleNamespace(status_code=200, message="",
+                                     output=types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)]))
+    return fake_call
+
+
+def run_single(doc: str):
+    """改动前的做法：整篇文本一次调用"""
+    return idm.parse_extraction(idm.call_with_messages_qwen_plus(idm.SYSTEM_PROMPT, doc))
+
+
+def run_chunked(doc: str):
+    tech, prod = {}, {}
+    for i, _, t, p in idm.iter_chunk_extractions(doc):
+        tech[i], prod[i] = t, p
+    order = sorted(tech)
+    return idm.merge_words(tech[i] for i in order), idm.merge_words(prod[i] for i in order)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, nargs="+", default=[20000, 60000])
+    ap.add_argument("--base-ms", type=float, default=300)
+    ap.add_argument("--ms-per-kchar", type=float, default=40)
+    args = ap.parse_args()
+
+    idm.Generation.call = fake_call_factory(args.base_ms, args.ms_per_kchar)
+    import builtins
+    _print = builtins.print
+    print(f"concurrency={idm.LLM_CONCURRENCY}  chunk_chars={idm.MAX_CHARS}  overlap={idm.OVERLAP}")
+    for n in args.chars:
+        doc = make_doc(n)
+        builtins.print = lambda *a, **k: None  # 屏蔽流水线日志
+        try:
+            idm.get_extraction_cache().clear()
+            t0 = time.perf_counter(); single = run_single(doc); t1 = time.perf_counter()
+            idm.get_extraction_cache().clear()
+            chunked = run_chunked(doc); t2 = time.perf_counter()
+        finally:
+            builtins.print = _print
+        same = set(single[0]) == set(chunked[0]) and set(single[1]) == set(chunked[1])
+        print(f"chars={len(doc):>7}  chunks={len(split_text(doc)):>3}  "
+              f"single={t1 - t0:7.3f}s  chunked={t2 - t1:7.3f}s  x{(t1 - t0) / (t2 - t1):5.2f}  same_words={same}")
+
+
+if __name__ == "__main__":
+    main()
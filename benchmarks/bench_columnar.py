@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+rank 表查询：逐条遍历 dict vs detail_repo.RankColumns 列式查询。
+
+    python benchmarks/bench_columnar.py --rows 100000
+
+把 data/rank_table_*.json 放大到约 --rows 行，对比
+1) 过滤（类型 + 领域 + 年份）后按分数取前 100
+2) 全表按类型排序取前 100
+3) 按 (领域, 年份) 求平均 key_score
+"""
+from __future__ import annotations
+import argparse, glob, json, math, os, time
+
+from _synth import DATA_DIR, scale_rank
+
+from services.detail_repo import RankColumns
+from services.ranking_service import norm_type, score_of
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# ---------- dict 版本（原 ranking_page 的写法） ----------
+def dict_filter_top(rows, t, field, year, k):
+    out = [r for r in rows
+           if norm_type(r.get("type")) == t and (r.get("field") or "").strip() == field
+           and str(r.get("year", "")).strip() == str(year)]
+    out.sort(key=score_of, reverse=True)
+    return out[:k]
+
+
+def dict_type_top(rows, t, k):
+    out = [r for r in rows if norm_type(r.get("type")) == t]
+    out.sort(key=score_of, reverse=True)
+    return out[:k]
+
+
+def dict_group_mean(rows):
+    acc = {}
+    for r in rows:
+        ks = r.get("key_score")
+        if not isinstance(ks, (int, float)):
+            continue
+        key = ((r.get("field") or "").strip(), r.get("year"))
+        s, c = acc.get(key, (0.0, 0))
+        acc[key] = (s + ks, c + 1)
+    return {k: s / c for k, (s, c) in acc.items()}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    base = []
+    for fp in sorted(glob.glob(os.path.join(DATA_DIR, "rank_table_*.json"))):
+        with open(fp, "r", encoding="utf-8") as f:
+            base.extend(json.load(f))
+    rows = scale_rank(base, max(1, math.ceil(args.rows / len(base))))
+
+    t0 = time.perf_counter()
+    cols = RankColumns(rows)
+    build = time.perf_counter() - t0
+    print(f"rows={len(rows)}  RankColumns build={build * 1e3:.1f} ms (每个数据快照一次)")
+
+    field, year = "视频生成", 2023
+    cases = [
+        ("filter+top100",
+         lambda: dict_filter_top(rows, "tech", field, year, 100),
+         lambda: cols.records(cols.top(cols.mask(types=("技术",), field=field, year=year), 100))),
+        ("type top100",
+         lambda: dict_type_top(rows, "product", 100),
+         lambda: cols.records(cols.top(cols.mask(types=("产品",)), 100))),
+        ("mean by field/year",
+         lambda: dict_group_mean(rows),
+         lambda: cols.group_mean(cols.key_score)),
+    ]
+    for name, f_dict, f_col in cases:
+        a, b = f_dict(), f_col()
+        if isinstance(a, list):
+            assert [r["id"] for r in a] == [r["id"] for r in b], name
+        td, tc = _timeit(f_dict, args.repeat), _timeit(f_col, args.repeat)
+        print(f"{name:<20} dict={td * 1e3:8.2f} ms  columnar={tc * 1e3:8.2f} ms  x{td / tc:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+normalize_terms：原嵌套循环 vs term_matcher.TermMatcher（预筛 + RapidFuzz 批量）。
+
+    python benchmarks/bench_fuzzy.py --sizes 1000 10000 100000 --words 30
+
+词库由 rank_table_*.json 的名称加随机后缀扩充到指定规模；待匹配词一半来自词库（带扰动），
+一半是随机词。每个规模都会校验两种实现的输出完全一致。
+"""
+from __future__ import annotations
+import argparse, glob, json, os, random, time
+
+from _synth import DATA_DIR
+
+from services.term_matcher import TermMatcher
+
+_ALPHA = "abcdefghijklmnopqrstuvwxyz0123456789-"
+_CJK = "模型网络视频芯片语音识别生成深度学习框架机器人脑机接口训练推理算法系统平台图像"
+
+
+def loop_normalize(extracted_words, key_words):
+    """原 intelligent_discovery.normalize_terms 的实现（作为基准）"""
+    from rapidfuzz import fuzz
+
+    normalized = []
+    for word in extracted_words:
+        word_low = word.lower()
+        best = None
+        best_score = 0
+        for key in key_words:
+            score = fuzz.partial_ratio(word_low, key.lower())
+            if score > best_score:
+                best_score = score
+                best = key
+        if best and best_score >= 70:
+            normalized.append(best)
+        else:
+            normalized.append(word)
+    return list(dict.fromkeys(normalized))
+
+
+def _rand_token(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return "".join(rng.choice(_ALPHA) for _ in range(rng.randint(3, 9)))
+    return "".join(rng.choice(_CJK) for _ in range(rng.randint(2, 5)))
+
+
+def make_dictionary(size: int, rng: random.Random):
+    names = []
+    for fp in sorted(glob.glob(os.path.join(DATA_DIR, "rank_table_*.json"))):
+        with open(fp, "r", encoding="utf-8") as f:
+            names.extend(r["name"] for r in json.load(f) if r.get("name"))
+    out = list(names[:size])
+    while len(out) < size:
+        out.append(f"{rng.choice(names)} {_rand_token(rng)}" if rng.random() < 0.5 else _rand_token(rng))
+    return out
+
+
+def make_words(keys, n: int, rng: random.Random):
+    words = []
+    for i in range(n):
+        if i % 2 == 0:
+            k = rng.choice(keys)
+            cut = rng.randint(0, max(0, len(k) // 3))
+            words.append(k[cut:].upper() if rng.random() < 0.3 else k[cut:])
+        else:
+            words.append(_rand_token(rng))
+    return words
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--words", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        keys = make_dictionary(size, rng)
+        words = make_words(keys, args.words, rng)
+
+        t0 = time.perf_counter()
+        ref = loop_normalize(words, keys)
+        t_loop = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        matcher = TermMatcher(keys)
+        t_build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        got = matcher.normalize(words)
+        t_match = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        single = [matcher.match_one(w) for w in words]
+        t_single = time.perf_counter() - t0
+
+        assert got == ref, f"mismatch at size={size}"
+        assert list(dict.fromkeys(h or w for w, h in zip(words, single))) == ref
+        print(f"dict={size:<7} words={len(words):<4} loop={t_loop * 1e3:9.1f} ms  "
+              f"matcher={t_match * 1e3:7.1f} ms (extractOne {t_single * 1e3:7.1f} ms)  "
+              f"build={t_build * 1e3:7.1f} ms  x{t_loop / t_match:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+关系图核心：原 dict-of-sets 关系索引 vs graph_core（CSR 邻接），networkx 作为结果参照。
+
+    python benchmarks/bench_graph_core.py --scales 1 16 64
+
+每个规模把 data/ 放大后逐领域构建，给出构建耗时、索引常驻内存（tracemalloc，构建完成后仍占用的部分）、
+邻居 / 两跳查询耗时，并与 networkx.DiGraph（每种关系一张图）逐节点核对邻居、入度出度、两跳和不分方向的合并邻居。
+"""
+from __future__ import annotations
+import argparse, glob, json, os, tempfile, time, tracemalloc
+from typing import Dict, List, Set
+
+from _synth import write_scaled
+
+import networkx as nx
+
+from services.graph_core import REL_COMPANY_COUNTRY, REL_PRODUCT_COMPANY, build_graph_core
+
+
+def dict_of_sets(edges) -> Dict[str, Dict[str, Set[str]]]:
+    """原 _build_domain_items 里的关系索引（作为基准，这里每种关系都建）"""
+    out: Dict[str, Dict[str, Set[str]]] = {}
+    for e in edges:
+        s, t = e.get("source"), e.get("target")
+        if not s or not t:
+            continue
+        out.setdefault(e.get("relation") or "", {}).setdefault(s, set()).add(t)
+    return out
+
+
+def reference(edges) -> Dict[str, nx.DiGraph]:
+    graphs: Dict[str, nx.DiGraph] = {}
+    for e in edges:
+        s, t = e.get("source"), e.get("target")
+        if s and t:
+            graphs.setdefault(e.get("relation") or "", nx.DiGraph()).add_edge(s, t)
+    return graphs
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = fn()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, dt, peak
+
+
+def check(core, graphs: Dict[str, nx.DiGraph]) -> int:
+    """逐关系、逐节点与 networkx 核对，返回不一致数"""
+    bad = 0
+    for rel, g in graphs.items():
+        for v in g.nodes:
+            bad += core.neighbors(v, rel) != sorted(g.successors(v))
+            bad += core.neighbors(v, rel, reverse=True) != sorted(g.predecessors(v))
+            bad += core.degree(v, rel) != g.out_degree(v)
+            bad += core.degree(v, rel, reverse=True) != g.in_degree(v)
+    merged = nx.compose_all(list(graphs.values())).to_undirected() if graphs else nx.Graph()
+    for v in merged.nodes:
+        bad += core.adjacent(v) != sorted(merged.neighbors(v))
+    pc, cc = graphs.get(REL_PRODUCT_COMPANY), graphs.get(REL_COMPANY_COUNTRY)
+    if pc is not None and cc is not None:
+        for p in pc.nodes:
+            want = sorted({c for m in pc.successors(p) if m in cc for c in cc.successors(m)})
+            bad += core.two_hop(p, REL_PRODUCT_COMPANY, REL_COMPANY_COUNTRY) != want
+    return bad
+
+
+def bench(k: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        write_scaled(tmp, k)
+        rels: List[dict] = []
+        for fp in sorted(glob.glob(os.path.join(tmp, "relation_*.json"))):
+            with open(fp, "r", encoding="utf-8") as f:
+                rels.append(json.load(f))
+
+        n_edges = sum(len(r["edges"]) for r in rels)
+        t_old = t_new = 0.0
+        m_old = m_new = 0
+        q_old = q_new = 0.0
+        bad = 0
+        for r in rels:
+            old, dt, peak = _measure(lambda: dict_of_sets(r["edges"]))
+            t_old += dt; m_old += peak
+            core, dt, peak = _measure(lambda: build_graph_core(r["nodes"], r["edges"]))
+            t_new += dt; m_new += peak
+
+            pc, cc = old.get(REL_PRODUCT_COMPANY, {}), old.get(REL_COMPANY_COUNTRY, {})
+            products = list(pc)
+            t0 = time.perf_counter()
+            for p in products:
+                comps = sorted(pc.get(p, set()))
+                countries: Set[str] = set()
+                for c in comps:
+                    countries |= cc.get(c, set())
+                sorted(countries)
+            q_old += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            for p in products:
+                core.neighbors(p, REL_PRODUCT_COMPANY)
+                core.two_hop(p, REL_PRODUCT_COMPANY, REL_COMPANY_COUNTRY)
+            q_new += time.perf_counter() - t0
+
+            bad += check(core, reference(r["edges"]))
+
+        print(f"scale={k:>4}  edges={n_edges:>7}  build: sets={t_old * 1e3:7.1f}ms csr={t_new * 1e3:7.1f}ms  "
+              f"mem: sets={m_old / 1e6:6.2f}MB csr={m_new / 1e6:6.2f}MB ({m_new / max(m_old, 1):4.0%})  "
+              f"query: sets={q_old * 1e3:6.1f}ms csr={q_new * 1e3:6.1f}ms  mismatches={bad}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 16, 64])
+    args = ap.parse_args()
+    for k in args.scales:
+        bench(k)
+
+
+if __name__ == "__main__":
+    main()
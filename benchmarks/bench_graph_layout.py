@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+服务端图谱布局：graph_layout.force_layout vs networkx 的 Fruchterman–Reingold（稠密矩阵版，
+networkx.spring_layout 在 500 节点以上要用 scipy，这里直接调用它内部的稠密实现作参照）。
+
+    python benchmarks/bench_graph_layout.py --scales 1 8 32 128
+
+每个规模把 relation_brain.json 放大 k 倍后布局，给出耗时和两个质量指标：
+edge = 平均边长 / 平均点对距离（越小越好）；overlap = 最近邻距离的 5% 分位 / 平均点对距离（越大重叠越少）。
+networkx 参照只跑到 --nx-max 个节点。
+"""
+from __future__ import annotations
+import argparse, json, os, time
+
+from _synth import DATA_DIR, scale_relation
+
+import networkx as nx
+import numpy as np
+from networkx.drawing.layout import _fruchterman_reingold
+
+from services.graph_core import build_graph_core
+from services.graph_layout import ITERATIONS, force_layout
+
+
+def quality(pos: np.ndarray, edges: np.ndarray):
+    n = len(pos)
+    el = np.linalg.norm(pos[edges[:, 0]] - pos[edges[:, 1]], axis=1).mean()
+    idx = np.random.default_rng(0).choice(n, min(n, 1500), replace=False)
+    d = np.linalg.norm(pos[idx, None] - pos[None, idx], axis=2)
+    np.fill_diagonal(d, np.inf)
+    mean = d[np.isfinite(d)].mean()
+    return el / mean, np.percentile(d.min(axis=1), 5) / mean
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 8, 32, 128])
+    ap.add_argument("--nx-max", type=int, default=1500)
+    args = ap.parse_args()
+
+    with open(os.path.join(DATA_DIR, "relation_brain.json"), "r", encoding="utf-8") as f:
+        base = json.load(f)
+    for k in args.scales:
+        rel = scale_relation(base, k)
+        core = build_graph_core(rel["nodes"], rel["edges"])
+        adj = core.undirected
+        n = len(core)
+        rows = np.repeat(np.arange(n), adj.degrees())
+        edges = np.stack([rows, adj.indices_np], axis=1)
+        edges = edges[edges[:, 0] < edges[:, 1]]
+
+        t0 = time.perf_counter(); pos = force_layout(adj); t1 = time.perf_counter()
+        q = quality(pos, edges)
+        line = (f"scale={k:>4}  nodes={n:>6}  edges={len(edges):>6}  "
+                f"ours={t1 - t0:6.2f}s  edge/overlap={q[0]:.3f}/{q[1]:.4f}")
+        if n <= args.nx_max:
+            g = nx.Graph()
+            g.add_nodes_from(range(n))
+            g.add_edges_from(edges.tolist())
+            t0 = time.perf_counter()
+            ref = _fruchterman_reingold(nx.to_numpy_array(g), iterations=ITERATIONS, seed=np.random.RandomState(0))
+            t1 = time.perf_counter()
+            q = quality(ref, edges)
+            line += f"  networkx={t1 - t0:6.2f}s  edge/overlap={q[0]:.3f}/{q[1]:.4f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
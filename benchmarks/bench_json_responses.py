@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+图谱 / 详情接口的响应序列化：每次请求 flask.jsonify vs 每个数据快照预编码一次（json_codec）。
+
+    python benchmarks/bench_json_responses.py --scale 1 --repeat 200
+
+逐领域给出 /api/graph、/api/portrait_graph 每次请求生成响应体的 CPU 时间（process_time）和字节数，
+/api/detail 取全部卡片的平均（含拼装 payload 的时间）。“encode” 列是预编码一次的耗时（数据更新后在后台预热里发生）。
+--scale > 1 时把 data/ 放大后写入临时目录再测。
+"""
+from __future__ import annotations
+import argparse, os, tempfile, time
+
+from _synth import write_scaled
+
+os.environ.setdefault("DATA_WATCH_INTERVAL", "0")
+
+from flask import jsonify
+
+from app import app
+from services import data_store, graph_repo, json_codec, portrait_repo
+from views.base_view import _detail_payload, _json_bytes
+
+
+def per_call(fn, repeat: int) -> float:
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - t0) / repeat
+
+
+def row(label: str, data, enc: json_codec.Encoded, repeat: int) -> str:
+    before = jsonify(data).get_data()
+    t_before = per_call(lambda: jsonify(data).get_data(), repeat)
+    t_after = per_call(lambda: _json_bytes(enc).get_data(), repeat)
+    t_encode = per_call(lambda: json_codec.encode(data), max(1, repeat // 10))
+    return (f"{label:<36} jsonify={t_before * 1e3:7.3f}ms {len(before) / 1024:7.1f}KB   "
+            f"pre-encoded={t_after * 1e3:7.3f}ms {len(enc.body) / 1024:7.1f}KB   "
+            f"x{t_before / max(t_after, 1e-9):6.1f}  size={len(enc.body) / len(before):4.0%}  "
+            f"encode={t_encode * 1e3:6.2f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    if args.scale > 1:
+        tmp = tempfile.mkdtemp(prefix="bench_json_")
+        write_scaled(tmp, args.scale)
+        data_store.RELATION_GLOB = os.path.join(tmp, "relation_*.json")
+        data_store.RANK_GLOB = os.path.join(tmp, "rank_table_*.json")
+        data_store.invalidate()
+
+    print(f"encoder={'orjson' if json_codec.orjson is not None else 'json'}")
+    with app.test_request_context():
+        for d in data_store.get_store().domains():
+            print(row(f"/api/graph?domain={d}", graph_repo.build_graph_for_domain(d),
+                      graph_repo.build_graph_for_domain_json(d), args.repeat))
+            print(row(f"/api/portrait_graph?domain={d}", portrait_repo.load_graph_for_domain(d),
+                      portrait_repo.load_graph_for_domain_json(d), args.repeat))
+
+        items = graph_repo.build_items_from_graphs()
+        payloads = [_detail_payload(it["id"], it) for it in items]
+        cache = {it["id"]: json_codec.encode(p) for it, p in zip(items, payloads)}
+        # 详情体积小，比较整条处理路径：拼 payload + jsonify vs 查缓存 + 直接返回字节
+        t_before = per_call(lambda: [jsonify(_detail_payload(it["id"], it)).get_data() for it in items], 3) / len(items)
+        t_after = per_call(lambda: [_json_bytes(cache[it["id"]]).get_data() for it in items], 3) / len(items)
+        b_before = sum(len(jsonify(p).get_data()) for p in payloads) / len(items)
+        b_after = sum(len(e.body) for e in cache.values()) / len(items)
+        print(f"{'/api/detail/<id> (avg)':<36} jsonify={t_before * 1e3:7.3f}ms {b_before / 1024:7.1f}KB   "
+              f"pre-encoded={t_after * 1e3:7.3f}ms {b_after / 1024:7.1f}KB   "
+              f"x{t_before / max(t_after, 1e-9):6.1f}  size={b_after / b_before:4.0%}")
+
+
+if __name__ == "__main__":
+    main()
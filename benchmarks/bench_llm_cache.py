@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+抽取缓存（llm_cache）的离线校验 + 命中耗时（本地假模型，替换 Generation.call，不访问网络）。
+
+    python benchmarks/bench_llm_cache.py --repeat 200
+
+先逐项校验，任一项不满足直接 AssertionError：
+- 相同输入（含仅空白不同）只调用一次模型，hits / misses 计数正确
+- 超过 TTL 的条目视为未命中，重新调用模型
+- 条目数超过 max_entries、总字节数超过 max_bytes 时按最近访问时间淘汰
+- 模型调用失败（非 200 / 抛异常）返回 "{}"，且不写入缓存
+再给出未命中（假模型 --model-ms）与命中时每次调用的耗时。缓存库放在临时目录。
+"""
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time, types
+
+from _synth import ROOT_DIR  # noqa: F401  (设置 sys.path)
+
+import services.intelligent_discovery  # noqa: E402
+from services import llm_cache  # noqa: E402
+
+idm = sys.modules["services.intelligent_discovery"]
+report = print  # 流水线日志被屏蔽时仍能输出结果
+_TMP = tempfile.mkdtemp(prefix="llm_cache_")
+
+
+class FakeModel:
+    """按输入返回固定 JSON；status 非 200 或 raises=True 时模拟调用失败"""
+
+    def __init__(self, delay_ms: float = 0.0):
+        self.calls = 0
+        self.delay = delay_ms / 1000.0
+        self.status = 200
+        self.raises = False
+
+    def __call__(self, **kw):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.raises:
+            raise ConnectionError("network down")
+        text = kw["messages"][1]["content"]
+        msg = types.SimpleNamespace(content=json.dumps({"all_tech_words": [text[:8]], "all_product_words": []},
+                                                       ensure_ascii=False))
+        return types.SimpleNamespace(status_code=self.status, message="error" if self.status != 200 else "",
+                                     output=types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)]))
+
+
+def use(model: FakeModel, **cache_kw) -> llm_cache.ExtractionCache:
+    """换上假模型和一个新的缓存库"""
+    cache = llm_cache.ExtractionCache(os.path.join(_TMP, f"cache_{time.monotonic_ns()}.db"), **cache_kw)
+    idm.Generation.call = model
+    idm.get_extraction_cache = lambda: cache
+    return cache
+
+
+def call(text: str) -> str:
+    return idm.call_with_messages_qwen_plus(idm.SYSTEM_PROMPT, text)
+
+
+def check_hits():
+    model = FakeModel()
+    cache = use(model)
+    first = call("深度学习 用于 图像生成")
+    assert call("深度学习 用于 图像生成") == first
+    assert call("  深度学习\n用于\t图像生成 ") == first  # 仅空白不同
+    assert model.calls == 1, model.calls
+    assert (cache.hits, cache.misses) == (2, 1), cache.stats()
+    call("另一段文本")
+    assert model.calls == 2
+    report("ok  repeated input -> one model call", cache.stats())
+
+
+def check_ttl():
+    model = FakeModel()
+    cache = use(model, ttl=0.2)
+    call("会过期的文本")
+    call("会过期的文本")
+    assert model.calls == 1
+    time.sleep(0.3)
+    call("会过期的文本")
+    assert model.calls == 2, model.calls
+    assert cache.stats()["entries"] == 1
+    report("ok  expired entry is a miss", cache.stats())
+
+
+def check_entry_eviction():
+    model = FakeModel()
+    cache = use(model, max_entries=3)
+    for t in ("a1", "a2", "a3"):
+        call(t)
+        time.sleep(0.01)
+    call("a1")  # 命中，a1 变成最近访问
+    time.sleep(0.01)
+    call("a4")  # 超出 3 条：淘汰最久未访问的 a2
+    assert cache.stats()["entries"] == 3 and cache.evictions == 1, cache.stats()
+    n = model.calls
+    call("a1"); call("a3"); call("a4")
+    assert model.calls == n, "a1 / a3 / a4 应该仍在缓存里"
+    call("a2")
+    assert model.calls == n + 1, "a2 应该已被淘汰"
+    report("ok  LRU eviction at max_entries", cache.stats())
+
+
+def check_byte_eviction():
+    model = FakeModel()
+    texts = [f"字节上限{i}" * 4 for i in range(6)]
+    size = len(call_size_probe(texts[0]))
+    cache = use(model, max_bytes=size * 3)
+    for t in texts:
+        call(t)
+        time.sleep(0.01)
+    st = cache.stats()
+    assert st["bytes"] <= size * 3 and st["entries"] == 3 and cache.evictions == 3, st
+    n = model.calls
+    call(texts[-1])
+    assert model.calls == n
+    call(texts[0])
+    assert model.calls == n + 1
+    report("ok  LRU eviction at max_bytes", st)
+
+
+def call_size_probe(text: str) -> bytes:
+    use(FakeModel())
+    return call(text).encode("utf-8")
+
+
+def check_failures_not_cached():
+    model = FakeModel()
+    cache = use(model)
+    model.status = 500
+    assert call("失败的调用") == "{}"
+    model.status, model.raises = 200, True
+    assert call("失败的调用") == "{}"
+    assert cache.stats()["entries"] == 0, cache.stats()
+    model.raises = False
+    call("失败的调用")
+    assert model.calls == 3 and cache.stats()["entries"] == 1
+    report("ok  failed calls are not cached", cache.stats())
+
+
+def bench(repeat: int, model_ms: float):
+    model = FakeModel(model_ms)
+    use(model)
+    text = "深度学习与扩散模型用于图像生成。" * 200
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        call(f"{i}{text}")
+    t1 = time.perf_counter()
+    for i in range(repeat):
+        call(f"{i}{text}")
+    t2 = time.perf_counter()
+    assert model.calls == repeat
+    report(f"chars={len(text)}  miss={(t1 - t0) / repeat * 1e3:7.2f}ms  hit={(t2 - t1) / repeat * 1e3:6.2f}ms  "
+           f"(fake model {model_ms:.0f}ms)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--model-ms", type=float, default=20)
+    args = ap.parse_args()
+
+    import builtins
+    _print = builtins.print
+    builtins.print = lambda *a, **k: None  # 屏蔽调用日志
+    try:
+        for check in (check_hits, check_ttl, check_entry_eviction, check_byte_eviction,
+                      check_failures_not_cached):
+            check()
+        bench(args.repeat, args.model_ms)
+    finally:
+        builtins.print = _print
+
+
+if __name__ == "__main__":
+    main()
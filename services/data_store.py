@@ -0,0 +1,345 @@
+# services/data_store.py
+# -*- coding: utf-8 -*-
+"""
+统一数据层：data/ 下的 relation_*.json 与 rank_table_*.json 每个文件只解析一次，
+graph_repo / detail_repo / portrait_repo / intelligent_discovery 都从这里读。
+
+返回的都是只读视图（tuple / MappingProxyType），里面的 node / edge / row dict
+是各模块共享的同一份对象，调用方不要原地修改。
+"""
+from __future__ import annotations
+import os, json, glob, threading, time, unicodedata
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple, Mapping, Set, Callable
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+RELATION_GLOB = os.getenv("RELATION_GLOB", os.path.join(DATA_DIR, "relation_*.json"))
+RANK_GLOB = os.getenv("RANK_GLOB", os.path.join(DATA_DIR, "rank_table_*.json"))
+
+# 兼容旧环境变量：
+# GRAPH_FILES  —— relation/rank 混合清单（graph_repo 原用法）
+# DETAIL_FILES —— 只覆盖 rank 清单（detail_repo 原用法），例如
+#                 DETAIL_FILES="data/rank_table_video.json,data/rank_table_brain.json"
+ENV_GRAPH_FILES = os.getenv("GRAPH_FILES", "").strip()
+ENV_DETAIL_FILES = os.getenv("DETAIL_FILES", "").strip()
+
+# 后台轮询数据文件的间隔（秒），0 表示不启动 watcher
+WATCH_INTERVAL = float(os.getenv("DATA_WATCH_INTERVAL", "5") or 0)
+
+
+def norm_id(s: Any) -> str:
+    """rank 记录 / 节点 id 的统一归一化（NFKC + strip）。"""
+    try:
+        return unicodedata.normalize("NFKC", str(s or "")).strip()
+    except Exception:
+        return str(s or "").strip()
+
+
+def file_sig(path: str) -> Optional[Tuple[int, int]]:
+    """文件签名 (mtime_ns, size)；文件不存在返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def domain_of(path: str) -> str:
+    """relation_brain.json / rank_table_brain.json -> brain"""
+    base = os.path.splitext(os.path.basename(path))[0]
+    return base.replace("relation_", "", 1).replace("rank_table_", "", 1)
+
+
+# ---------------- 只读视图 ----------------
+@dataclass(frozen=True)
+class RelationData:
+    """一个 relation_*.json：nodes / edges 原样保留，另带 id -> node 索引。"""
+    name: str
+    path: str
+    domain: str
+    sig: Optional[Tuple[int, int]]
+    nodes: Tuple[Dict[str, Any], ...]
+    edges: Tuple[Dict[str, Any], ...]
+    node_by_id: Mapping[str, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class RankData:
+    """一个 rank_table_*.json：rows 原样保留，另带 id -> row 索引（同 id 后出现的覆盖前面的）。"""
+    name: str
+    path: str
+    domain: str
+    sig: Optional[Tuple[int, int]]
+    rows: Tuple[Dict[str, Any], ...]
+    by_id: Mapping[str, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class DataStore:
+    version: int                                # 每次有文件变化 +1
+    sigs: Mapping[str, Optional[Tuple[int, int]]]  # 已发现文件 path -> 加载时的签名
+    relations: Tuple[RelationData, ...]
+    ranks: Tuple[RankData, ...]
+    rank_by_id: Mapping[str, Dict[str, Any]]    # 所有 rank 文件合并：id -> row
+    rank_source: Mapping[str, str]              # id -> 所在 rank 文件名
+    # 派生结构缓存（卡片、检索索引、图谱 payload……），随快照一起替换。
+    # 约定：key 为 (name, domain) 元组的条目只依赖该领域的文件，领域没变时可被新快照继承。
+    _memo: Dict[Any, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _memo_lock: Any = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _key_locks: Dict[Any, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def memo(self, key: Any, builder: Callable[["DataStore"], Any]) -> Any:
+        """每个快照上 builder(self) 只执行一次；锁按 key 分开，不同 key 的构建可以并行。"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._memo_lock:
+            lock = self._key_locks.setdefault(key, threading.RLock())
+        with lock:
+            if key not in self._memo:
+                val = builder(self)
+                with self._memo_lock:
+                    self._memo[key] = val
+                    self._key_locks.pop(key, None)
+            return self._memo[key]
+
+    def relation(self, domain: str) -> Optional[RelationData]:
+        for r in self.relations:
+            if r.domain == domain:
+                return r
+        return None
+
+    def rank(self, domain: str) -> Optional[RankData]:
+        for r in self.ranks:
+            if r.domain == domain:
+                return r
+        return None
+
+    def domains(self) -> List[str]:
+        """有 relation 文件的领域，按文件顺序。"""
+        return [r.domain for r in self.relations]
+
+
+# ---------------- 加载 ----------------
+def _split_env(v: str) -> List[str]:
+    files = [p.strip() for p in v.split(",") if p.strip()]
+    return [p if os.path.isabs(p) else os.path.join(ROOT_DIR, p) for p in files]
+
+
+def discover_files() -> List[str]:
+    if ENV_GRAPH_FILES:
+        rel_files = _split_env(ENV_GRAPH_FILES)
+    else:
+        rel_files = sorted(glob.glob(RELATION_GLOB))
+    if ENV_DETAIL_FILES:
+        rank_files = _split_env(ENV_DETAIL_FILES)
+    elif ENV_GRAPH_FILES:
+        rank_files = []
+    else:
+        rank_files = sorted(glob.glob(RANK_GLOB))
+    return list(dict.fromkeys(rel_files + rank_files))
+
+
+def _read_json(path: str) -> Any:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[DataStore] 读取失败 {os.path.basename(path)}: {e}")
+        return None
+
+
+def load_file(path: str) -> Optional[Any]:
+    """解析一个数据文件，按内容判断是 relation 还是 rank；无法识别返回 None。"""
+    sig = file_sig(path)  # 先取签名再读：读的过程中文件又变了，下次比对时会再加载一次
+    data = _read_json(path)
+    name = os.path.basename(path)
+    domain = domain_of(path)
+
+    # 关系文件
+    if isinstance(data, dict) and ("nodes" in data or "Nodes" in data or "edges" in data or "links" in data):
+        nodes = tuple(data.get("nodes") or data.get("Nodes") or [])
+        edges = tuple(data.get("edges") or data.get("Edges") or data.get("links") or [])
+        node_by_id: Dict[str, Dict[str, Any]] = {}
+        for n in nodes:
+            nid = n.get("id")
+            if nid and nid not in node_by_id:
+                node_by_id[nid] = n
+        return RelationData(name, path, domain, sig, nodes, edges, MappingProxyType(node_by_id))
+
+    # rank 表：可能是 list 或 dict.rows
+    if isinstance(data, dict):
+        data = data.get("rows") or data.get("data") or []
+    if isinstance(data, list):
+        rows = tuple(r for r in data if isinstance(r, dict))
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for r in rows:
+            rid = norm_id(r.get("id") or r.get("ID"))
+            if rid:
+                by_id[rid] = r
+        return RankData(name, path, domain, sig, rows, MappingProxyType(by_id))
+    return None
+
+
+def build_store(files: List[Any], sigs: Dict[str, Optional[Tuple[int, int]]], version: int = 0) -> DataStore:
+    """由已解析的 RelationData / RankData 组装 DataStore（文件顺序即合并顺序）。"""
+    relations = tuple(f for f in files if isinstance(f, RelationData))
+    ranks = tuple(f for f in files if isinstance(f, RankData))
+    rank_by_id: Dict[str, Dict[str, Any]] = {}
+    rank_source: Dict[str, str] = {}
+    for rk in ranks:
+        for rid, row in rk.by_id.items():
+            rank_by_id[rid] = row
+            rank_source[rid] = rk.name
+    return DataStore(version, MappingProxyType(dict(sigs)), relations, ranks,
+                     MappingProxyType(rank_by_id), MappingProxyType(rank_source))
+
+
+# ---------------- 当前快照 ----------------
+# 请求线程只读 _STORE 引用；重新加载在 _RELOAD_LOCK 内串行完成、派生结构预热后整体替换，
+# 请求既不会看到加载到一半的数据，也不用替 watcher 付重建的开销。
+# _LOCK 只保护首次加载和引用替换，预热期间不持有。
+_LOCK = threading.Lock()
+_RELOAD_LOCK = threading.Lock()
+_STORE: Optional[DataStore] = None
+_WARMERS: List[Callable[[DataStore, Set[str]], None]] = []
+
+
+def register_warmer(fn: Callable[[DataStore, Set[str]], None]):
+    """注册预热函数 fn(store, changed_domains)：新快照发布前在后台线程里构建派生结构。"""
+    if fn not in _WARMERS:
+        _WARMERS.append(fn)
+    return fn
+
+
+def _warm(store: DataStore, changed: Set[str]):
+    for fn in list(_WARMERS):
+        try:
+            fn(store, changed)
+        except Exception as e:
+            print(f"[DataStore] 预热失败 {getattr(fn, '__qualname__', fn)}: {e}")
+
+
+def _inherit_memo(new: DataStore, old: DataStore, changed: Set[str]):
+    with old._memo_lock:
+        items = list(old._memo.items())
+    for key, val in items:
+        if isinstance(key, tuple) and len(key) == 2 and key[1] not in changed:
+            new._memo.setdefault(key, val)
+
+
+def _load_all(version: int) -> DataStore:
+    files, sigs = [], {}
+    for fp in discover_files():
+        f = load_file(fp)
+        sigs[fp] = f.sig if f is not None else file_sig(fp)
+        if f is not None:
+            files.append(f)
+    store = build_store(files, sigs, version)
+    print("[DataStore] Relations:", ", ".join(r.name for r in store.relations) or "(none)")
+    print("[DataStore] Ranks:", ", ".join(r.name for r in store.ranks) or "(none)")
+    print("[DataStore] Total rank records:", len(store.rank_by_id))
+    return store
+
+
+def get_store() -> DataStore:
+    global _STORE
+    store = _STORE
+    if store is None:
+        with _LOCK:
+            if _STORE is None:
+                _STORE = _load_all(0)
+            store = _STORE
+    return store
+
+
+def refresh() -> Set[str]:
+    """
+    按 (mtime, size) 重新检查数据文件，只重新解析变化了的文件，生成新快照后替换。
+    解析失败（例如文件正写到一半）时沿用旧数据。返回有变化的领域集合。
+    """
+    global _STORE
+    with _RELOAD_LOCK:
+        old = _STORE
+        if old is None:
+            store = get_store()
+            return set(store.domains()) | {r.domain for r in store.ranks}
+
+        prev = {f.path: f for f in old.relations + old.ranks}
+        files, sigs, changed = [], {}, set()
+        paths = discover_files()
+        for fp in paths:
+            sig = file_sig(fp)
+            if fp in old.sigs and old.sigs[fp] == sig:
+                sigs[fp] = sig
+                if fp in prev:
+                    files.append(prev[fp])
+                continue
+            f = load_file(fp)
+            if f is None:
+                f = prev.get(fp)
+            else:
+                sig = f.sig
+            sigs[fp] = sig
+            changed.add(domain_of(fp))
+            if f is not None:
+                files.append(f)
+        changed |= {domain_of(fp) for fp in old.sigs if fp not in sigs}
+        if not changed:
+            return set()
+
+        new = build_store(files, sigs, old.version + 1)
+        _inherit_memo(new, old, changed)
+        _warm(new, changed)
+        with _LOCK:
+            _STORE = new
+        print("[DataStore] Reloaded domains:", ", ".join(sorted(changed)), "-> version", new.version)
+        return changed
+
+
+def invalidate():
+    """强制全部重新加载（在锁内构建、预热好后再替换）。"""
+    global _STORE
+    with _RELOAD_LOCK:
+        new = _load_all((_STORE.version + 1) if _STORE is not None else 0)
+        _warm(new, set(new.domains()) | {r.domain for r in new.ranks})
+        with _LOCK:
+            _STORE = new
+
+
+# ---------------- 后台 watcher ----------------
+_WATCHER: Optional[threading.Thread] = None
+
+
+def _watch_loop(interval: float):
+    # 先在后台把当前快照的派生结构建好，首个请求不用付冷启动开销
+    store = get_store()
+    _warm(store, set(store.domains()) | {r.domain for r in store.ranks})
+    while interval > 0:
+        time.sleep(interval)
+        try:
+            refresh()
+        except Exception as e:
+            print("[DataStore] watcher 刷新失败:", e)
+
+
+def start_watcher(interval: Optional[float] = None) -> bool:
+    """
+    启动 stat 轮询线程（每个进程一个；gunicorn 每个 worker 各自导入 app 时启动）。
+    interval <= 0 时不轮询，只在后台预热一次当前快照；返回是否在轮询。
+    """
+    global _WATCHER
+    interval = WATCH_INTERVAL if interval is None else interval
+    with _LOCK:
+        if _WATCHER is None or (interval > 0 and not _WATCHER.is_alive()):
+            _WATCHER = threading.Thread(target=_watch_loop, args=(interval,), name="data-watcher", daemon=True)
+            _WATCHER.start()
+    return interval > 0
+
+
+def watcher_running() -> bool:
+    return _WATCHER is not None and _WATCHER.is_alive()
@@ -1,56 +1,142 @@
 # services/detail_repo.py
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import os, json, glob, unicodedata
-from typing import Dict, Any, List, Optional, Tuple
-from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Mapping, Sequence, Tuple
 
-ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(ROOT_DIR, "data")
+import numpy as np
 
-# 可用环境变量覆盖详细文件清单，例如：
-# DETAIL_FILES="data/rank_table_video.json,data/rank_table_brain.json"
-ENV_DETAIL_FILES = os.getenv("DETAIL_FILES", "").strip()
+from services.data_store import DataStore, get_store, norm_id, register_warmer
 
-def _discover_detail_files() -> List[str]:
-    if ENV_DETAIL_FILES:
-        files = [p.strip() for p in ENV_DETAIL_FILES.split(",") if p.strip()]
-        return [p if os.path.isabs(p) else os.path.join(ROOT_DIR, p) for p in files]
-    # 默认扫描 6 大领域的 rank_table_*.json
-    return sorted(glob.glob(os.path.join(DATA_DIR, "rank_table_*.json")))
+# 文件清单、环境变量覆盖（DETAIL_FILES）与解析都在 data_store 里统一处理
 
-def _safe_norm(s: str) -> str:
-    try:
-        return unicodedata.normalize("NFKC", (s or "")).strip()
-    except Exception:
-        return (s or "").strip()
-
-@lru_cache(maxsize=1)
-def load_all_details() -> Dict[str, Dict[str, Any]]:
+def load_all_details() -> Mapping[str, Dict[str, Any]]:
     """
-    返回 {detail_id -> 详细记录dict}
+    返回 {detail_id -> 详细记录dict}（只读）
     例如 detail_id= 'tech_video001' 或 'prod_video001' 等。
     """
-    id2detail: Dict[str, Dict[str, Any]] = {}
-    files = _discover_detail_files()
-    for fp in files:
-        try:
-            with open(fp, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            continue
-        if isinstance(data, list):
-            for rec in data:
-                did = _safe_norm(rec.get("id"))
-                if did:
-                    id2detail[did] = rec
-    # 可观测一次
-    print("[DetailRepo] Loaded detail files:", ", ".join([os.path.basename(p) for p in files]))
-    print("[DetailRepo] Total detail records:", len(id2detail))
-    return id2detail
+    return get_store().rank_by_id
 
 def get_detail_by_node_id(node_id: str) -> Optional[Dict[str, Any]]:
     """根据节点/详细记录 id（如 tech_video001）取详细信息。"""
     if not node_id:
         return None
-    return load_all_details().get(_safe_norm(node_id))
+    return load_all_details().get(norm_id(node_id))
+
+
+# ---------------- 列式视图 ----------------
+_SCORE_COLS = ("article_score", "patent_score", "report_score", "key_score")
+_CAT_COLS = ("field", "type", "country", "enterprise")
+
+
+def _num(v) -> float:
+    return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+
+
+def _year(v) -> int:
+    try:
+        return int(str(v).strip())
+    except (TypeError, ValueError):
+        return -1
+
+
+class RankColumns:
+    """
+    rank 记录的列式表示：
+    - 分数列：float64，缺失为 NaN；score 为排行榜口径（key_score，缺失时取三项均值，再缺为 0）
+    - year：int32，缺失 / 非数字为 -1
+    - field / type / country / enterprise：int32 类别码 + categories[col] 取值表（空值为 ""）
+    行顺序与 load_all_details() 的迭代顺序一致，rows[i] 是原始记录。
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.rows: List[Dict[str, Any]] = list(rows)
+        n = len(self.rows)
+        self.ids = np.array([r.get("id") for r in self.rows], dtype=object)
+        self.names = np.array([r.get("name") for r in self.rows], dtype=object)
+        for col in _SCORE_COLS:
+            setattr(self, col, np.fromiter((_num(r.get(col)) for r in self.rows), dtype=np.float64, count=n))
+        self.year = np.fromiter((_year(r.get("year")) for r in self.rows), dtype=np.int32, count=n)
+
+        parts = np.vstack([self.article_score, self.patent_score, self.report_score])
+        cnt = np.sum(~np.isnan(parts), axis=0)
+        mean = np.divide(np.nansum(parts, axis=0), cnt, out=np.zeros(n), where=cnt > 0)
+        self.score = np.where(np.isnan(self.key_score), mean, self.key_score)
+
+        self.categories: Dict[str, Tuple[str, ...]] = {}
+        self._code_of: Dict[str, Dict[str, int]] = {}
+        for col in _CAT_COLS:
+            code_of: Dict[str, int] = {}
+            codes = np.fromiter(
+                (code_of.setdefault((r.get(col) or "").strip(), len(code_of)) for r in self.rows),
+                dtype=np.int32, count=n)
+            setattr(self, col, codes)
+            self._code_of[col] = code_of
+            self.categories[col] = tuple(code_of)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def code(self, col: str, value: str) -> int:
+        """类别值 -> 码；不存在返回 -1（与任何行都不相等）。"""
+        return self._code_of[col].get((value or "").strip(), -1)
+
+    def mask(self, types: Sequence[str] = (), field: str = "", year: Optional[int] = None,
+             country: str = "") -> np.ndarray:
+        """向量化过滤；空条件不过滤。types 为原始类型值（如 ("技术",)）。"""
+        m = np.ones(len(self), dtype=bool)
+        if types:
+            m &= np.isin(self.type, [self.code("type", t) for t in types])
+        if field:
+            m &= self.field == self.code("field", field)
+        if year is not None:
+            m &= self.year == int(year)
+        if country:
+            m &= self.country == self.code("country", country)
+        return m
+
+    def top(self, mask: Optional[np.ndarray] = None, k: Optional[int] = None,
+            by: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        按 by（默认 score）降序取前 k 个行号；同分保持原顺序，与 Python 稳定排序结果一致。
+        k 远小于命中数时先 argpartition 找出第 k 大的值，只对不低于它的行排序。
+        """
+        vals = self.score if by is None else by
+        idx = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if k is not None and k < len(idx):
+            if k <= 0:
+                return idx[:0]
+            kth = np.partition(vals[idx], len(idx) - k)[len(idx) - k]
+            idx = idx[vals[idx] >= kth]
+        order = np.argsort(-vals[idx], kind="stable")
+        return idx[order[:k]] if k is not None else idx[order]
+
+    def group_mean(self, value: Optional[np.ndarray] = None, mask: Optional[np.ndarray] = None
+                   ) -> Dict[Tuple[str, int], float]:
+        """按 (field, year) 分组求均值（默认 score），忽略 NaN；例如各领域各年份的平均关键度。"""
+        vals = self.score if value is None else value
+        ok = ~np.isnan(vals)
+        if mask is not None:
+            ok &= mask
+        years, ycode = np.unique(self.year[ok], return_inverse=True)
+        nf = len(self.categories["field"])
+        gid = self.field[ok].astype(np.int64) * len(years) + ycode
+        sums = np.bincount(gid, weights=vals[ok], minlength=nf * len(years))
+        cnts = np.bincount(gid, minlength=nf * len(years))
+        out: Dict[Tuple[str, int], float] = {}
+        for g in np.flatnonzero(cnts):
+            f, y = divmod(int(g), len(years))
+            out[(self.categories["field"][f], int(years[y]))] = float(sums[g] / cnts[g])
+        return out
+
+    def records(self, idx: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.rows[i] for i in idx]
+
+
+def load_columns(store: Optional[DataStore] = None) -> RankColumns:
+    """当前数据快照上的列式视图（每个快照只构建一次）。"""
+    return (store or get_store()).memo("detail_repo.columns", lambda st: RankColumns(st.rank_by_id.values()))
+
+
+@register_warmer
+def _warm(store: DataStore, changed):
+    load_columns(store)
@@ -0,0 +1,176 @@
+# services/ego_graph.py
+# -*- coding: utf-8 -*-
+"""
+画像页的 k 跳邻域（ego graph）：以一个节点为中心，在全部领域合并后的关系图上取 k 跳以内的子图。
+
+- 邻接用 graph_core 的跨领域合并图，节点属性取自 graph_repo.build_graph_for_portrait，均每个快照构建一次
+- 年份过滤：节点年份取 rank 记录的 year；没有年份的节点（企业、国家等）不受过滤，中心节点始终保留
+- 节点预算：逐层扩展，每层候选按 key_score（缺失时取 rank 分数兜底，再按 PageRank）降序取到预算为止，
+  只从已保留的节点继续往外扩，返回的子图始终连通
+- 结果按 (中心, 跳数, 预算, 年份区间) 缓存在快照上的 LRU 里，数据更新后随快照一起失效
+"""
+from __future__ import annotations
+import os, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import data_store
+from services.graph_core import GraphCore, merged_graph_core
+from services.graph_metrics import get_metrics
+from services.graph_repo import build_graph_for_portrait
+from services.ranking_service import score_of
+
+DEFAULT_DEPTH = 2
+MAX_DEPTH = 3
+DEFAULT_NODES = int(os.getenv("PORTRAIT_MAX_NODES", "80"))
+MAX_NODES = 300
+CACHE_SIZE = int(os.getenv("PORTRAIT_CACHE_SIZE", "256"))
+
+_NO_SCORE = -1.0
+
+
+class _PortraitGraph:
+    """合并图 + 按整数节点编号排好的节点属性"""
+
+    def __init__(self, store: data_store.DataStore):
+        self.core: GraphCore = merged_graph_core(store)
+        n = len(self.core)
+        ids = self.core.strings.strings
+        by_id = {nd["id"]: nd for nd in build_graph_for_portrait(store)["nodes"]}
+        rank_by_id = store.rank_by_id
+        self.nodes: List[Dict[str, Any]] = []
+        self.year: List[int] = []
+        self.score: List[float] = []
+        for nid in ids:
+            nd = by_id.get(nid) or {}
+            det = rank_by_id.get(data_store.norm_id(nid)) or {}
+            year = _year(det.get("year"))
+            score = score_of(det) if det else _NO_SCORE
+            self.nodes.append({
+                "id": nid,
+                "name": nd.get("name") or nid,
+                "kind": nd.get("type") or "node",
+                "field": det.get("field") or "",
+                "domain": nd.get("domain") or "",
+                "year": year if year >= 0 else None,
+                "score": score if det else None,
+            })
+            self.year.append(year)
+            self.score.append(score)
+        pr = get_metrics(store).pagerank.tolist()
+        # 候选排序键：分数高在前，同分 PageRank 高在前，再按 id
+        self.rank_key: List[Tuple[float, float, int]] = [(-self.score[i], -pr[i], i) for i in range(n)]
+
+
+class _LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self._d: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            v = self._d.get(key)
+            if v is not None:
+                self._d.move_to_end(key)
+            return v
+
+    def put(self, key, value):
+        with self._lock:
+            self._d[key] = value
+            self._d.move_to_end(key)
+            while len(self._d) > self.size:
+                self._d.popitem(last=False)
+
+
+def _year(v) -> int:
+    try:
+        return int(str(v).strip()[:4])
+    except (TypeError, ValueError):
+        return -1
+
+
+def _portrait_graph(store: data_store.DataStore) -> _PortraitGraph:
+    return store.memo("ego_graph.graph", _PortraitGraph)
+
+
+def _cache(store: data_store.DataStore) -> _LRU:
+    return store.memo("ego_graph.cache", lambda st: _LRU(CACHE_SIZE))
+
+
+def ego_graph(node_id: str, depth: int = DEFAULT_DEPTH, max_nodes: int = DEFAULT_NODES,
+              start_year: Optional[int] = None, end_year: Optional[int] = None,
+              store: Optional[data_store.DataStore] = None) -> Optional[Dict[str, Any]]:
+    """
+    返回 {center, depth, nodes:[{id,name,kind,field,domain,year,score,hop}], links:[{source,target,rel}], truncated}；
+    节点不在图中时返回 None。结果会被缓存，调用方不要原地修改。
+    """
+    store = store or data_store.get_store()
+    depth = max(0, min(MAX_DEPTH, depth))
+    max_nodes = max(1, min(MAX_NODES, max_nodes))
+    key = (node_id, depth, max_nodes, start_year, end_year)
+    cache = _cache(store)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    pg = _portrait_graph(store)
+    center = pg.core.strings.id(node_id)
+    if center < 0:
+        return None
+    out = _collect(pg, center, depth, max_nodes, start_year, end_year)
+    cache.put(key, out)
+    return out
+
+
+def _collect(pg: _PortraitGraph, center: int, depth: int, max_nodes: int,
+             start_year: Optional[int], end_year: Optional[int]) -> Dict[str, Any]:
+    core, years = pg.core, pg.year
+
+    def in_range(i: int) -> bool:
+        y = years[i]
+        if y < 0:
+            return True
+        return (start_year is None or y >= start_year) and (end_year is None or y <= end_year)
+
+    hop: Dict[int, int] = {center: 0}
+    frontier = [center]
+    truncated = False
+    for d in range(1, depth + 1):
+        cand = {j for i in frontier for j in core.undirected.row(i) if j not in hop and in_range(j)}
+        if not cand:
+            break
+        room = max_nodes - len(hop)
+        ranked = sorted(cand, key=pg.rank_key.__getitem__)
+        if len(ranked) > room:
+            truncated = True
+            ranked = ranked[:room]
+        if not ranked:
+            break
+        for j in ranked:
+            hop[j] = d
+        frontier = ranked
+
+    nodes = []
+    for i, h in hop.items():
+        nd = dict(pg.nodes[i])
+        nd["hop"] = h
+        nodes.append(nd)
+    links = []
+    ids = core.strings
+    for rel, (fwd, _) in core.adj.items():
+        for i in hop:
+            for j in fwd.row(i):
+                if j in hop:
+                    links.append({"source": ids[i], "target": ids[j], "rel": rel})
+    return {
+        "center": ids[center],
+        "depth": depth,
+        "nodes": nodes,
+        "links": links,
+        "truncated": truncated,
+    }
+
+
+@data_store.register_warmer
+def _warm(store: data_store.DataStore, changed):
+    _portrait_graph(store)
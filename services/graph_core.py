@@ -0,0 +1,207 @@
+# services/graph_core.py
+# -*- coding: utf-8 -*-
+"""
+关系图核心：把 relation_*.json 的边转成按关系类型分组的 CSR 邻接（indptr 偏移 + 邻居数组）。
+
+- 节点 id 统一驻留在 StringTable 里，按字符串排序编号：整数 id 的大小顺序就是字符串顺序，
+  邻居数组升序存放，查出来的邻居天然按 id 字符串排好序
+- 每种关系一份正向（source -> target）和反向（target -> source）邻接，重复边去重
+- 另有一份不分关系、不分方向的合并邻接（undirected），供 k 跳邻域等遍历使用
+- neighbors / degree 为 O(度)；two_hop 为两跳邻居的并集（升序）
+- 每个领域一份，挂在数据快照上（("graph_core", 领域)），其他领域文件变化时直接沿用；
+  另有跨领域合并的一份（merged_graph_core）
+"""
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from services import data_store
+
+REL_PRODUCT_COMPANY = "产品-归属-企业"
+REL_COMPANY_COUNTRY = "企业-归属-国家"
+REL_PRODUCT_TECH = "产品-应用-技术"
+
+
+class StringTable:
+    """字符串驻留表：排序去重后按下标编号，查找用二分（不另建 dict）；查不到的字符串编号为 -1"""
+
+    def __init__(self, strings: Iterable[str]):
+        self.strings: List[str] = sorted(set(strings))
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+    def id(self, s: Optional[str]) -> int:
+        if not isinstance(s, str):
+            return -1
+        i = bisect_left(self.strings, s)
+        return i if i < len(self.strings) and self.strings[i] == s else -1
+
+    def lookup(self, ids: Iterable[int]) -> List[str]:
+        strings = self.strings
+        return [strings[i] for i in ids]
+
+
+class CSR:
+    """
+    indices[indptr[i]:indptr[i + 1]] 为节点 i 的邻居（升序、去重）。
+    存成 array.array：单行切片比 numpy 快得多；需要向量化计算时用 indptr_np / indices_np（零拷贝视图）。
+    """
+    __slots__ = ("indptr", "indices")
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr = array("q", indptr.astype(np.int64).tobytes())
+        self.indices = array("i", indices.astype(np.int32).tobytes())
+
+    def row(self, i: int) -> List[int]:
+        if i < 0:
+            return []
+        return self.indices[self.indptr[i]:self.indptr[i + 1]].tolist()
+
+    def degree(self, i: int) -> int:
+        return self.indptr[i + 1] - self.indptr[i] if i >= 0 else 0
+
+    @property
+    def indptr_np(self) -> np.ndarray:
+        return np.frombuffer(self.indptr, dtype=np.int64)
+
+    @property
+    def indices_np(self) -> np.ndarray:
+        return np.frombuffer(self.indices, dtype=np.int32)
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr_np)
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.indptr) * self.indptr.itemsize + len(self.indices) * self.indices.itemsize)
+
+
+def _csr(n: int, src: np.ndarray, dst: np.ndarray) -> CSR:
+    # 合成 src * n + dst 一次排序去重，得到按 (src, dst) 升序的边
+    key = np.unique(src.astype(np.int64) * n + dst)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(key // n, minlength=n), out=indptr[1:])
+    return CSR(indptr, key % n)
+
+
+class GraphCore:
+    """一个领域的关系图：strings 为节点 id 表，adj[关系] = (正向 CSR, 反向 CSR)，undirected 为合并邻接"""
+
+    def __init__(self, strings: StringTable, adj: Mapping[str, Tuple[CSR, CSR]], undirected: CSR):
+        self.strings = strings
+        self.adj = dict(adj)
+        self.undirected = undirected
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    @property
+    def relations(self) -> List[str]:
+        return list(self.adj)
+
+    def _csr(self, relation: str, reverse: bool) -> Optional[CSR]:
+        pair = self.adj.get(relation)
+        return pair[1 if reverse else 0] if pair else None
+
+    def neighbor_ids(self, i: int, relation: str, reverse: bool = False) -> List[int]:
+        csr = self._csr(relation, reverse)
+        return csr.row(i) if csr is not None else []
+
+    def neighbors(self, node_id: str, relation: str, reverse: bool = False) -> List[str]:
+        """node_id 沿 relation（reverse 为逆向）的邻居 id，按字符串升序"""
+        return self.strings.lookup(self.neighbor_ids(self.strings.id(node_id), relation, reverse))
+
+    def adjacent(self, node_id: str) -> List[str]:
+        """不分关系、不分方向的邻居 id（升序）"""
+        return self.strings.lookup(self.undirected.row(self.strings.id(node_id)))
+
+    def degree(self, node_id: str, relation: Optional[str] = None, reverse: bool = False) -> int:
+        """relation 为 None 时为各关系出度 + 入度之和（同一关系的重复边只算一次）"""
+        i = self.strings.id(node_id)
+        if relation is not None:
+            csr = self._csr(relation, reverse)
+            return csr.degree(i) if csr is not None else 0
+        return sum(fwd.degree(i) + rev.degree(i) for fwd, rev in self.adj.values())
+
+    def two_hop(self, node_id: str, first: str, second: str,
+                reverse_first: bool = False, reverse_second: bool = False) -> List[str]:
+        """先沿 first、再沿 second 走两跳能到达的节点 id（去重、升序），如 产品 -> 企业 -> 国家"""
+        mid = self.neighbor_ids(self.strings.id(node_id), first, reverse_first)
+        csr = self._csr(second, reverse_second)
+        if not mid or csr is None:
+            return []
+        if len(mid) == 1:
+            return self.strings.lookup(csr.row(mid[0]))
+        reached = set()
+        for j in mid:
+            reached.update(csr.row(j))
+        return self.strings.lookup(sorted(reached))
+
+    @property
+    def nbytes(self) -> int:
+        return self.undirected.nbytes + sum(fwd.nbytes + rev.nbytes for fwd, rev in self.adj.values())
+
+
+def build_graph_core(nodes: Iterable[Mapping[str, Any]], edges: Iterable[Mapping[str, Any]]) -> GraphCore:
+    """由 relation 文件的 nodes / edges 构建；缺 source / target 的边跳过"""
+    triples: List[Tuple[str, str, str]] = []
+    for e in edges:
+        s, t = e.get("source"), e.get("target")
+        if not s or not t:
+            continue
+        triples.append((e.get("relation") or "", s, t))
+    strings = StringTable([n["id"] for n in nodes if n.get("id")] +
+                          [s for _, s, _ in triples] + [t for _, _, t in triples])
+
+    by_rel: Dict[str, Tuple[List[str], List[str]]] = {}
+    for rel, s, t in triples:
+        srcs, dsts = by_rel.setdefault(rel, ([], []))
+        srcs.append(s)
+        dsts.append(t)
+
+    # 构建期临时的 字符串 -> 编号 索引，建完即丢
+    index = {v: i for i, v in enumerate(strings.strings)}
+    n = len(strings)
+    adj: Dict[str, Tuple[CSR, CSR]] = {}
+    all_src: List[np.ndarray] = []
+    all_dst: List[np.ndarray] = []
+    for rel, (srcs, dsts) in by_rel.items():
+        src = np.fromiter((index[v] for v in srcs), dtype=np.int32, count=len(srcs))
+        dst = np.fromiter((index[v] for v in dsts), dtype=np.int32, count=len(dsts))
+        adj[rel] = (_csr(n, src, dst), _csr(n, dst, src))
+        all_src.append(src)
+        all_dst.append(dst)
+    ends = np.concatenate(all_src + all_dst) if all_src else np.empty(0, dtype=np.int32)
+    others = np.concatenate(all_dst + all_src) if all_src else ends
+    undirected = _csr(n, ends, others)
+    return GraphCore(strings, adj, undirected)
+
+
+def graph_core(store: Optional[data_store.DataStore], domain: str) -> Optional[GraphCore]:
+    """某个领域的关系图（每个快照只构建一次）；没有 relation 文件时返回 None"""
+    store = store or data_store.get_store()
+    if store.relation(domain) is None:
+        return None
+    return store.memo(("graph_core", domain), lambda st: _build(st, domain))
+
+
+def _build(store: data_store.DataStore, domain: str) -> GraphCore:
+    rel = store.relation(domain)
+    return build_graph_core(rel.nodes, rel.edges)
+
+
+def merged_graph_core(store: Optional[data_store.DataStore] = None) -> GraphCore:
+    """全部领域合并后的关系图（同 id 节点合并、重复边去重），每个快照构建一次"""
+    return (store or data_store.get_store()).memo("graph_core.merged", _build_merged)
+
+
+def _build_merged(store: data_store.DataStore) -> GraphCore:
+    return build_graph_core([n for r in store.relations for n in r.nodes],
+                            [e for r in store.relations for e in r.edges])
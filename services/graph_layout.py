@@ -0,0 +1,84 @@
+# services/graph_layout.py
+# -*- coding: utf-8 -*-
+"""
+领域图谱的服务端布局：前端拿到带 x / y 的节点后用 ECharts layout:'none' 直接绘制，不再在浏览器里跑力导向。
+
+- 算法同 networkx.spring_layout（Fruchterman–Reingold）：斥力 k²/d、引力 d²/k，每轮按温度限制位移、线性降温
+- 邻接取自 graph_core 的合并邻接（CSR），引力只在边上算；斥力按行分块算，内存不随 n² 增长；
+  节点数超过 GRAPH_LAYOUT_EXACT_MAX 时斥力每轮只对固定数量的随机节点计算并按比例放大（近似）
+- 初始位置用固定种子，同样的数据得到同样的布局
+- 按 ("graph_layout", 领域) 挂在数据快照上：只有该领域的文件变化时才重算
+"""
+from __future__ import annotations
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from services import data_store
+from services.graph_core import CSR, graph_core
+
+ITERATIONS = int(os.getenv("GRAPH_LAYOUT_ITERATIONS", "80"))
+EXACT_MAX = int(os.getenv("GRAPH_LAYOUT_EXACT_MAX", "1000"))
+# 输出坐标范围 [0, SIZE]（ECharts 会按包围盒自动缩放，这里只决定精度）
+SIZE = 1000.0
+_BLOCK = 512
+
+
+def force_layout(adj: CSR, iterations: int = ITERATIONS, seed: int = 0,
+                 exact_max: int = EXACT_MAX) -> np.ndarray:
+    """返回 (n, 2) 坐标，范围 [0, SIZE]；adj 为无向邻接（每条边两个方向各存一次）"""
+    indptr, indices = adj.indptr_np, adj.indices_np
+    n = len(indptr) - 1
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    if n <= 1:
+        return pos * SIZE
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    cols = indices.astype(np.int64)
+    k2 = np.float32(1.0 / n)
+    k = np.sqrt(1.0 / n)
+    t = 0.1
+    dt = t / (iterations + 1)
+    for _ in range(iterations):
+        disp = np.zeros((n, 2))
+        # 斥力：Σ_j delta_ij · k² / d²（float32 分块）
+        x, y = pos[:, 0].astype(np.float32), pos[:, 1].astype(np.float32)
+        if n <= exact_max:
+            xs, ys, scale = x, y, 1.0
+        else:
+            pick = rng.choice(n, exact_max, replace=False)
+            xs, ys, scale = x[pick], y[pick], n / exact_max
+        for s in range(0, n, _BLOCK):
+            dx = x[s:s + _BLOCK, None] - xs[None, :]
+            dy = y[s:s + _BLOCK, None] - ys[None, :]
+            w = k2 / np.maximum(dx * dx + dy * dy, np.float32(1e-4))
+            disp[s:s + _BLOCK, 0] += scale * (dx * w).sum(axis=1)
+            disp[s:s + _BLOCK, 1] += scale * (dy * w).sum(axis=1)
+        # 引力：沿边 -delta_ij · d / k
+        if len(cols):
+            delta = pos[rows] - pos[cols]
+            f = np.sqrt(np.maximum(np.einsum("ij,ij->i", delta, delta), 1e-4)) / k
+            disp[:, 0] -= np.bincount(rows, weights=delta[:, 0] * f, minlength=n)
+            disp[:, 1] -= np.bincount(rows, weights=delta[:, 1] * f, minlength=n)
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp))
+        length = np.where(length < 0.01, 0.1, length)
+        pos += disp * (t / length)[:, None]
+        t -= dt
+    pos -= pos.min(axis=0)
+    span = pos.max()
+    return pos * (SIZE / span if span > 0 else 1.0)
+
+
+def domain_layout(store: Optional[data_store.DataStore], domain: str) -> Dict[str, Tuple[float, float]]:
+    """领域图谱节点 id -> (x, y)；没有 relation 文件时为空"""
+    store = store or data_store.get_store()
+    return store.memo(("graph_layout", domain), lambda st: _build(st, domain))
+
+
+def _build(store: data_store.DataStore, domain: str) -> Dict[str, Tuple[float, float]]:
+    core = graph_core(store, domain)
+    if core is None:
+        return {}
+    pos = np.round(force_layout(core.undirected), 1).tolist()
+    return {nid: (x, y) for nid, (x, y) in zip(core.strings.strings, pos)}
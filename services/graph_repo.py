@@ -1,22 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import json, os, glob, unicodedata, re
-from typing import Dict, Any, List, Optional, Tuple, Set
-from functools import lru_cache
-from services.detail_repo import load_all_details  # 复用你已有的索引
-
-ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(ROOT_DIR, "data")
-ENV_GRAPH_FILES = os.getenv("GRAPH_FILES", "").strip()
+import hashlib, heapq, unicodedata
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple, Set, Mapping
+from services import data_store
+from services.graph_core import REL_COMPANY_COUNTRY, REL_PRODUCT_COMPANY, REL_PRODUCT_TECH, graph_core
+from services.graph_layout import domain_layout
+from services.graph_metrics import get_metrics
+from services.json_codec import Encoded, encode
+from services.search_service import SearchIndex, build_search_index
 
 TECH_TYPES = {"技术", "tech", "Technology"}
 PROD_TYPES = {"产品", "product", "Product"}
 COMP_TYPES = {"企业", "company", "Company", "enterprise", "Enterprise"}
 COUNTRY_TYPES = {"国家", "country", "Country"}
 
-RELATION_GLOB = os.getenv("RELATION_GLOB", os.path.join(DATA_DIR, "relation_*.json"))
-RANK_GLOB = os.getenv("RANK_GLOB", os.path.join(DATA_DIR, "rank_table_*.json"))
-
 
 def _norm(s: str) -> str:
     try:
@@ -25,50 +23,6 @@ def _norm(s: str) -> str:
         return (s or "").lower().strip()
 
 
-def _discover_files(glob_pat: str) -> List[str]:
-    if ENV_GRAPH_FILES:
-        # 兼容旧环境变量：GRAPH_FILES 里也可能混着 rank/relations；都加载
-        files = [p.strip() for p in ENV_GRAPH_FILES.split(",") if p.strip()]
-        return [p if os.path.isabs(p) else os.path.join(ROOT_DIR, p) for p in files]
-    return sorted(glob.glob(glob_pat))
-
-
-def _safe_load(path: str) -> Dict[str, Any]:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        return {"nodes": [], "edges": [], "rows": []}
-    if not isinstance(data, dict) and not isinstance(data, list):
-        return {"nodes": [], "edges": [], "rows": []}
-
-    # 关系文件
-    if isinstance(data, dict) and ("nodes" in data or "edges" in data or "links" in data):
-        nodes = data.get("nodes") or data.get("Nodes") or []
-        edges = data.get("edges") or data.get("Edges") or data.get("links") or []
-        return {"nodes": nodes, "edges": edges, "rows": []}
-
-    # rank 表：可能是 list 或 dict.rows
-    if isinstance(data, list):
-        return {"nodes": [], "edges": [], "rows": data}
-    if isinstance(data, dict):
-        rows = data.get("rows") or data.get("data") or []
-        return {"nodes": [], "edges": [], "rows": rows}
-
-    return {"nodes": [], "edges": [], "rows": []}
-
-
-@lru_cache(maxsize=1)
-def load_all() -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, Dict[str, Any]]]]:
-    rel_files = _discover_files(RELATION_GLOB)
-    rank_files = _discover_files(RANK_GLOB)
-    relations = [(os.path.basename(fp), _safe_load(fp)) for fp in rel_files]
-    ranks = [(os.path.basename(fp), _safe_load(fp)) for fp in rank_files]
-    print("[GraphRepo] Relations:", ", ".join([n for n, _ in relations]) or "(none)")
-    print("[GraphRepo] Ranks:", ", ".join([n for n, _ in ranks]) or "(none)")
-    return relations, ranks
-
-
 def _node_name(id2node: Dict[str, Dict[str, Any]], node_id: Optional[str]) -> str:
     if not node_id:
         return "-"
@@ -82,45 +36,102 @@ def _chips_html(label: str, names: List[str]) -> str:
     return f'<div class="meta-line"><span class="meta-label">{label}</span>{chips}</div>'
 
 
-@lru_cache(maxsize=1)
+def _id_key(domain: str, node_id: Optional[str], kind: str, name: str) -> str:
+    return f"{domain}|{node_id}" if node_id else f"{domain}|{kind}:{name}"
+
+
+def _hash_id(key: str, salt: int = 0) -> int:
+    data = key if not salt else f"{key}#{salt}"
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=6).digest(), "big")
+
+
+def _stable_id(domain: str, node_id: Optional[str], kind: str, name: str) -> int:
+    """
+    卡片 id 由 (领域, _node_id) 哈希得到（48 bit，JS 里也是安全整数），
+    重建某个领域不会让其他领域的 /detail/<id> 变号。没有 node id 的节点退化为按 kind+name。
+    """
+    return _hash_id(_id_key(domain, node_id, kind, name))
+
+
+def _domain_keys(store: data_store.DataStore) -> List[str]:
+    """有 relation 或 rank 文件的领域：先按 relation 文件顺序，再补只有 rank 的领域。"""
+    keys = store.domains()
+    return keys + [r.domain for r in store.ranks if r.domain not in keys]
+
+
+def _sort_key(it: Dict[str, Any]) -> Tuple[str, str]:
+    return it["kind"], _norm(it["name"])
+
+
 def build_items_from_graphs() -> List[Dict[str, Any]]:
-    relations, ranks = load_all()
-
-    # ------- 预索引 rank：按 id 存，便于合并 -------
-    rank_by_id: Dict[str, Dict[str, Any]] = {}
-    id_source_map: Dict[str, str] = {}
-    for src_name, pkt in ranks:
-        for r in pkt.get("rows", []):
-            rid = r.get("id") or r.get("ID")
-            if not rid:
-                continue
-            rank_by_id[rid] = r
-            id_source_map[rid] = src_name
+    """当前数据快照上的卡片列表（每个快照只构建一次）。"""
+    return data_store.get_store().memo("graph_repo.items", _build_items)
+
+
+def _domain_items(store: data_store.DataStore, domain: str) -> List[Dict[str, Any]]:
+    # 按 (name, domain) 挂在快照上：其他领域的文件变化时直接沿用，不重建
+    return store.memo(("graph_repo.items", domain), lambda st: _build_domain_items(st, domain))
+
 
+def _build_items(store: data_store.DataStore) -> List[Dict[str, Any]]:
+    """
+    各领域分区各自排好序，这里只做有序归并并处理极少见的 id 哈希冲突。
+    """
+    parts = {d: _domain_items(store, d) for d in _domain_keys(store)}
+    renamed = _resolve_id_collisions(parts)
+    tagged = [[(d, i, it) for i, it in enumerate(part)] for d, part in parts.items()]
     items: List[Dict[str, Any]] = []
-    auto_inc = 1000
+    for d, i, it in heapq.merge(*tagged, key=lambda t: _sort_key(t[2])):
+        new_id = renamed.get((d, i))
+        if new_id is not None:
+            it = dict(it, id=new_id)
+        items.append(it)
+    return items
+
+
+def _resolve_id_collisions(parts: Mapping[str, List[Dict[str, Any]]]) -> Dict[Tuple[str, int], int]:
+    """
+    同一 id 的卡片按哈希 key（领域|node id）排序，最小的保留原 id，其余用 key#1、key#2…… 重新哈希，
+    结果只取决于冲突的 key 本身，与领域的合并顺序无关。返回 (领域, 分区内下标) -> 新 id。
+    """
+    owners: Dict[int, List[Tuple[str, str, int]]] = {}
+    for d, part in parts.items():
+        for i, it in enumerate(part):
+            owners.setdefault(it["id"], []).append((_id_key(d, it.get("_node_id"), it["kind"], it["name"]), d, i))
+    renamed: Dict[Tuple[str, int], int] = {}
+    taken = set(owners)
+    for group in sorted(sorted(g) for g in owners.values() if len(g) > 1):
+        for key, d, i in group[1:]:
+            salt = 1
+            while _hash_id(key, salt) in taken:
+                salt += 1
+            renamed[(d, i)] = _hash_id(key, salt)
+            taken.add(renamed[(d, i)])
+    return renamed
+
+
+def _build_domain_items(store: data_store.DataStore, domain: str) -> List[Dict[str, Any]]:
+    """
+    单个领域的卡片：relation_{domain}.json 建卡，合并 rank_table_{domain}.json。
+    rank 只在同领域的表里查（按文件名归属领域），分区才能在其他领域文件变化时原样沿用；
+    记在别的领域 rank 表里的 id 不会合并到这里，而是在那个领域里单独建卡。
+    """
+    rel, rank = store.relation(domain), store.rank(domain)
 
-    # ------- 遍历 relation_* 构建基础卡片 -------
-    for source_name, g in relations:
-        nodes, edges = g["nodes"], g["edges"]
-        id2node = {n.get("id"): n for n in nodes if n.get("id")}
+    # ------- rank 索引：按 id 合并（data_store 已预建） -------
+    rank_by_id = rank.by_id if rank else {}
+    rank_source = rank.name if rank else ""
 
-        # 关系索引
-        product_to_companies: Dict[str, Set[str]] = {}
-        company_to_countries: Dict[str, Set[str]] = {}
-        product_to_techs: Dict[str, Set[str]] = {}
+    items: List[Dict[str, Any]] = []
 
-        for e in edges:
-            rel = e.get("relation") or ""
-            s, t = e.get("source"), e.get("target")
-            if not s or not t:
-                continue
-            if rel == "产品-归属-企业":
-                product_to_companies.setdefault(s, set()).add(t)
-            elif rel == "企业-归属-国家":
-                company_to_countries.setdefault(s, set()).add(t)
-            elif rel == "产品-应用-技术":
-                product_to_techs.setdefault(s, set()).add(t)
+    # ------- 遍历 relation_{domain} 构建基础卡片 -------
+    relations = [rel] if rel is not None else []
+    for rel in relations:
+        source_name, nodes = rel.name, rel.nodes
+        id2node = rel.node_by_id
+
+        # 关系索引（CSR 邻接，邻居按 id 升序）
+        core = graph_core(store, domain)
 
         # 技术
         for n in nodes:
@@ -136,14 +147,14 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
                     aliases.append(rname)
 
                 items.append({
-                    "id": auto_inc,
+                    "id": _stable_id(domain, rid, "关键技术", name),
                     "name": name,
                     "kind": "关键技术",
                     "org": "-",
                     "date": "—",
                     "abstract": row.get("abstract") or f"技术要点：{name}",
                     "_node_id": rid,
-                    "_source": row and id_source_map.get(rid, source_name) or source_name,
+                    "_source": row and rank_source or source_name,
                     "_aliases": aliases,
                     "_scores": {
                         "article": row.get("article_score"),
@@ -159,7 +170,6 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
                         "source": row.get("source"),
                     }
                 })
-                auto_inc += 1
 
         # 产品
         for n in nodes:
@@ -168,15 +178,13 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
                 pid = n.get("id")
                 name = n.get("name", "")
 
-                comp_ids = sorted(product_to_companies.get(pid, set()))
+                comp_ids = core.neighbors(pid, REL_PRODUCT_COMPANY)
                 comp_names = [_node_name(id2node, cid) for cid in comp_ids]
 
-                country_ids: Set[str] = set()
-                for cid in comp_ids:
-                    country_ids |= company_to_countries.get(cid, set())
-                country_names = [_node_name(id2node, c) for c in sorted(country_ids)]
+                country_ids = core.two_hop(pid, REL_PRODUCT_COMPANY, REL_COMPANY_COUNTRY)
+                country_names = [_node_name(id2node, c) for c in country_ids]
 
-                tech_ids = sorted(product_to_techs.get(pid, set()))
+                tech_ids = core.neighbors(pid, REL_PRODUCT_TECH)
                 tech_names = [_node_name(id2node, tid) for tid in tech_ids]
 
                 lines = []
@@ -208,14 +216,14 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
                         _chips_html("技术", tech_names) if tech_names else "")
 
                 items.append({
-                    "id": auto_inc,
+                    "id": _stable_id(domain, pid, "关键产品", name),
                     "name": name,
                     "kind": "关键产品",
                     "org": org_html,
                     "date": "—",
                     "abstract": row.get("abstract") or "",
                     "_node_id": pid,
-                    "_source": row and id_source_map.get(pid, source_name) or source_name,
+                    "_source": row and rank_source or source_name,
                     "_companies": comp_names,
                     "_countries": country_names,
                     "_techs": tech_names,
@@ -234,7 +242,6 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
                         "source": row.get("source"),
                     }
                 })
-                auto_inc += 1
 
         # 企业
         for n in nodes:
@@ -242,22 +249,20 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
             if t in COMP_TYPES:
                 name = n.get("name", "")
                 rid = n.get("id")
-                cset = company_to_countries.get(rid, set())
-                countries = [_node_name(id2node, c) for c in sorted(cset)]
+                countries = [_node_name(id2node, c) for c in core.neighbors(rid, REL_COMPANY_COUNTRY)]
                 org_html = _chips_html("国家", countries) if countries else "-"
                 row = rank_by_id.get(rid, {})
                 items.append({
-                    "id": auto_inc,
+                    "id": _stable_id(domain, rid, "企业", name),
                     "name": name,
                     "kind": "企业",
                     "org": org_html,
                     "date": "—",
                     "abstract": row.get("abstract") or f"企业：{name}",
                     "_node_id": rid,
-                    "_source": row and id_source_map.get(rid, source_name) or source_name,
+                    "_source": row and rank_source or source_name,
                     "_aliases": [row.get("name")] if row.get("name") and row.get("name") != name else [],
                 })
-                auto_inc += 1
 
         # 国家
         for n in nodes:
@@ -267,20 +272,24 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
                 rid = n.get("id")
                 row = rank_by_id.get(rid, {})
                 items.append({
-                    "id": auto_inc,
+                    "id": _stable_id(domain, rid, "国家", name),
                     "name": name,
                     "kind": "国家",
                     "org": "-",
                     "date": "—",
                     "abstract": row.get("abstract") or f"国家：{name}",
                     "_node_id": rid,
-                    "_source": row and id_source_map.get(rid, source_name) or source_name,
+                    "_source": row and rank_source or source_name,
                     "_aliases": [row.get("name")] if row.get("name") and row.get("name") != name else [],
                 })
-                auto_inc += 1
 
     # ------- rank-only：relation 中没有出现过的 id 也要建卡 -------
-    existing_ids = {it.get("_node_id") for it in items if it.get("_node_id")}
+    # node_id -> 第一张对应卡片，合并 rank 时 O(1) 命中，整体构建保持线性
+    item_by_node: Dict[str, Dict[str, Any]] = {}
+    for it in items:
+        nid = it.get("_node_id")
+        if nid and nid not in item_by_node:
+            item_by_node[nid] = it
 
     def _infer_kind(rk: Dict[str, Any]) -> str:
         t = _norm(rk.get("type") or "")
@@ -289,17 +298,15 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
         return "关键产品" if rk.get("enterprise") else "关键技术"
 
     for rid, rk in rank_by_id.items():
-        if rid in existing_ids:
+        it = item_by_node.get(rid)
+        if it is not None:
             # 已在 relation 中建卡：把 rank 名字作为别名追加到对应卡片（确保可检索）
-            for it in items:
-                if it.get("_node_id") == rid:
-                    aliases = it.setdefault("_aliases", [])
-                    if rk.get("name") and rk["name"] not in aliases and rk["name"] != it.get("name"):
-                        aliases.append(rk["name"])
-                    # 也可补全抽象
-                    if not it.get("abstract") and rk.get("abstract"):
-                        it["abstract"] = rk["abstract"]
-                    break
+            aliases = it.setdefault("_aliases", [])
+            if rk.get("name") and rk["name"] not in aliases and rk["name"] != it.get("name"):
+                aliases.append(rk["name"])
+            # 也可补全抽象
+            if not it.get("abstract") and rk.get("abstract"):
+                it["abstract"] = rk["abstract"]
             continue
 
         kind = _infer_kind(rk)
@@ -315,22 +322,21 @@ def build_items_from_graphs() -> List[Dict[str, Any]]:
             org_html = "".join(lines) if lines else "-"
 
         items.append({
-            "id": auto_inc,
+            "id": _stable_id(domain, rid, kind, name),
             "name": name,
             "kind": kind,
             "org": org_html,
             "date": "—",
             "abstract": rk.get("abstract") or "",
             "_node_id": rid,
-            "_source": id_source_map.get(rid, ""),
+            "_source": rank_source,
             "_companies": comp_names,
             "_countries": country_names,
             "_aliases": [],
         })
-        auto_inc += 1
 
     # 稳定排序
-    items.sort(key=lambda it: (it["kind"], _norm(it["name"])))
+    items.sort(key=_sort_key)
     return items
 
 
@@ -338,9 +344,48 @@ def get_items() -> List[Dict[str, Any]]:
     return build_items_from_graphs()
 
 
+def get_search_index() -> SearchIndex:
+    """与卡片列表同生命周期的检索索引（随数据快照一起重建）。"""
+    return _search_index(data_store.get_store())
+
+
+def _search_index(store: data_store.DataStore) -> SearchIndex:
+    return store.memo("graph_repo.search_index",
+                      lambda st: build_search_index(st.memo("graph_repo.items", _build_items), get_metrics(st)))
+
+
+def _item_indexes(store: Optional[data_store.DataStore] = None) -> Tuple[Mapping[int, Dict[str, Any]], Mapping[str, Dict[str, Any]]]:
+    """
+    与卡片列表一起构建一次的只读索引：
+    - id -> 卡片
+    - _node_id -> 卡片（同一节点出现在多张卡片时取排序后的第一张）
+    """
+    return (store or data_store.get_store()).memo("graph_repo.item_indexes", _build_item_indexes)
+
+
+def _build_item_indexes(store: data_store.DataStore) -> Tuple[Mapping[int, Dict[str, Any]], Mapping[str, Dict[str, Any]]]:
+    by_id: Dict[int, Dict[str, Any]] = {}
+    by_node: Dict[str, Dict[str, Any]] = {}
+    for it in store.memo("graph_repo.items", _build_items):
+        by_id[it["id"]] = it
+        nid = it.get("_node_id")
+        if nid:
+            by_node.setdefault(nid, it)
+    return MappingProxyType(by_id), MappingProxyType(by_node)
+
+
+def get_item(item_id: int) -> Optional[Dict[str, Any]]:
+    return _item_indexes()[0].get(item_id)
+
+
+def get_item_by_node_id(node_id: str) -> Optional[Dict[str, Any]]:
+    if not node_id:
+        return None
+    return _item_indexes()[1].get(node_id)
+
+
 def get_detail(item_id: int) -> Optional[Dict[str, Any]]:
-    mp = {it["id"]: it for it in get_items()}
-    it = mp.get(item_id)
+    it = get_item(item_id)
     if not it:
         return None
     # 从 _meta/_scores 提取可用信息
@@ -372,8 +417,8 @@ def get_detail(item_id: int) -> Optional[Dict[str, Any]]:
 
 
 def invalidate_cache():
-    load_all.cache_clear()
-    build_items_from_graphs.cache_clear()
+    """重新读取数据文件；派生缓存挂在数据快照上，随新快照一起重建。"""
+    data_store.invalidate()
 
 
 def _norm_type_portrait(t: str) -> str:
@@ -385,38 +430,27 @@ def _norm_type_portrait(t: str) -> str:
     return "node"
 
 
-def _domain_of(filename: str) -> str:
-    base = os.path.splitext(filename)[0]
-    return base.replace("relation_", "").replace("rank_table_", "")
-
-
-@lru_cache(maxsize=1)
-def _load_all_relations() -> List[Tuple[str, Dict[str, Any]]]:
-    files = sorted(glob.glob(RELATION_GLOB))
-    out: List[Tuple[str, Dict[str, Any]]] = []
-    for fp in files:
-        out.append((os.path.basename(fp), _safe_load_relation(fp)))
-    # 可选：启动时打印一下
-    print("[GraphRepo] Relations:", ", ".join([n for n, _ in out]))
-    return out
-
-
-def build_graph_for_portrait() -> Dict[str, Any]:
+def build_graph_for_portrait(store: Optional[data_store.DataStore] = None) -> Dict[str, Any]:
     """
     画像页图谱：
     - 合并所有 relation_*.json 的 nodes/edges（按 id 去重）
-    - 节点结构：{id,name,type(tech/product/company/country),aliases[],abstract,domain,score}
+    - 节点结构：{id,name,type(tech/product/company/country),aliases[],abstract,domain,score,
+      degree,pagerank,betweenness}（后三项见 graph_metrics）
     - 若 rank 索引里有相同 id，则把 rank.name 进 aliases，abstract/score 补充进去
+    每个数据快照只构建一次，调用方不要原地修改。
     """
-    rels = _load_all_relations()
-    rank_idx = load_all_details()  # {id -> 详情}
+    return (store or data_store.get_store()).memo("graph_repo.portrait_graph", _build_graph_for_portrait)
+
+
+def _build_graph_for_portrait(store: data_store.DataStore) -> Dict[str, Any]:
+    rank_idx = store.rank_by_id  # {id -> 详情}
 
     id2node: Dict[str, Dict[str, Any]] = {}
     edges: List[Dict[str, Any]] = []
 
-    for fname, pkt in rels:
-        domain = _domain_of(fname)
-        for n in pkt["nodes"]:
+    for rel in store.relations:
+        domain = rel.domain
+        for n in rel.nodes:
             nid = n.get("id")
             if not nid:
                 continue
@@ -436,7 +470,7 @@ def build_graph_for_portrait() -> Dict[str, Any]:
                 if nm and nm != id2node[nid]["name"] and nm not in id2node[nid]["aliases"]:
                     id2node[nid]["aliases"].append(nm)
 
-        for e in pkt["edges"]:
+        for e in rel.edges:
             s, t = e.get("source"), e.get("target")
             if not s or not t:
                 continue
@@ -458,39 +492,16 @@ def build_graph_for_portrait() -> Dict[str, Any]:
         node["abstract"] = det.get("abstract") or node["abstract"]
         node["score"] = det.get("key_score") or det.get("article_score")
 
+    # 结构指标（预热时已算好，这里只查表）
+    metrics = get_metrics(store)
+    for nid, node in id2node.items():
+        node.update(metrics.of(nid))
+
     return {"nodes": list(id2node.values()), "edges": edges}
 
 
 def invalidate_portrait_cache():
-    _load_all_relations.cache_clear()
-
-
-from functools import lru_cache
-from typing import List, Dict, Any, Tuple
-from services.detail_repo import load_all_details  # 直接用你现成的详情索引
-
-_DOMAIN_FILE_MAP_CACHE: Dict[str, str] = {}  # {domain_key: relation_file_abs_path}
-
-
-def _discover_relation_files() -> List[str]:
-    pat = os.path.join(DATA_DIR, "relation_*.json")
-    return sorted(glob.glob(pat))
-
-
-def _domain_key_from_filename(filename: str) -> str:
-    base = os.path.splitext(os.path.basename(filename))[0]  # relation_brain
-    return base.replace("relation_", "", 1)
-
-
-def _safe_load_relation(path: str) -> Dict[str, Any]:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        return {"nodes": [], "edges": []}
-    nodes = data.get("nodes") or data.get("Nodes") or []
-    edges = data.get("edges") or data.get("Edges") or data.get("links") or []
-    return {"nodes": nodes, "edges": edges}
+    invalidate_cache()
 
 
 def list_domains() -> List[Dict[str, str]]:
@@ -498,14 +509,7 @@ def list_domains() -> List[Dict[str, str]]:
     返回可用领域列表：[{key:'brain', name:'脑机接口'},{...}]
     name 只是友好名，默认用 key；你也可以按需映射。
     """
-    global _DOMAIN_FILE_MAP_CACHE
-    _DOMAIN_FILE_MAP_CACHE = {}
-    out = []
-    for fp in _discover_relation_files():
-        key = _domain_key_from_filename(fp)
-        _DOMAIN_FILE_MAP_CACHE[key] = fp
-        out.append({"key": key, "name": key})  # 需要中文名可以自己映射
-    return out
+    return [{"key": d, "name": d} for d in data_store.get_store().domains()]  # 需要中文名可以自己映射
 
 
 def _norm_portrait_type(t: str) -> str:
@@ -517,26 +521,44 @@ def _norm_portrait_type(t: str) -> str:
     return "node"
 
 
-@lru_cache(maxsize=16)
 def build_graph_for_domain(domain_key: str) -> Dict[str, Any]:
     """
     只加载一个领域：relation_{domain}.json
     节点合并详情 rank_table_{domain}.json（通过 detail_repo 的总索引自动命中）
+    结果挂在数据快照上；详情取自全部 rank 文件，任一数据文件变化都随新快照重建（布局坐标单独缓存，只按领域重算）。
     """
-    # 找文件
-    if not _DOMAIN_FILE_MAP_CACHE:
-        list_domains()  # 填充缓存
-    fp = _DOMAIN_FILE_MAP_CACHE.get(domain_key)
-    if not fp or not os.path.exists(fp):
-        # 兜底：空图
+    return _domain_graph(data_store.get_store(), domain_key)
+
+
+def build_graph_for_domain_json(domain_key: str) -> Encoded:
+    """build_graph_for_domain 的预编码 JSON（/api/graph 用），同样挂在快照上。"""
+    store = data_store.get_store()
+    if store.relation(domain_key) is None:
+        # 未知领域不挂缓存（领域名来自请求参数）
+        return encode(_domain_graph(store, domain_key))
+    return store.memo("graph_repo.domain_graph_json:" + domain_key,
+                      lambda st: encode(_domain_graph(st, domain_key)))
+
+
+def _domain_graph(store: data_store.DataStore, domain_key: str) -> Dict[str, Any]:
+    if store.relation(domain_key) is None:
         return {"domain": domain_key, "nodes": [], "edges": []}
+    # 依赖全局 rank_by_id，用字符串 key：不能被新快照按领域继承
+    return store.memo("graph_repo.domain_graph:" + domain_key, lambda st: _build_graph_for_domain(st, domain_key))
 
-    # 关系
-    rel = _safe_load_relation(fp)
-    nodes_raw, edges_raw = rel["nodes"], rel["edges"]
+
+def _build_graph_for_domain(store: data_store.DataStore, domain_key: str) -> Dict[str, Any]:
+    rel = store.relation(domain_key)
+    if rel is None:
+        # 兜底：空图
+        return {"domain": domain_key, "nodes": [], "edges": []}
+    nodes_raw, edges_raw = rel.nodes, rel.edges
 
     # 详情索引（全局一次加载，里面自然包含 rank_table_{domain}.json）
-    id2detail = load_all_details()
+    id2detail = store.rank_by_id
+
+    # 服务端布局坐标（只在该领域文件变化时重算）
+    layout = domain_layout(store, domain_key)
 
     # 汇总
     id2node: Dict[str, Dict[str, Any]] = {}
@@ -552,6 +574,8 @@ def build_graph_for_domain(domain_key: str) -> Dict[str, Any]:
                 "aliases": [],
                 "abstract": "",
             }
+            if nid in layout:
+                id2node[nid]["x"], id2node[nid]["y"] = layout[nid]
         else:
             alt = n.get("name")
             if alt and alt != id2node[nid]["name"] and alt not in id2node[nid]["aliases"]:
@@ -584,3 +608,12 @@ def build_graph_for_domain(domain_key: str) -> Dict[str, Any]:
         "nodes": list(id2node.values()),
         "edges": edges
     }
+
+
+@data_store.register_warmer
+def _warm(store: data_store.DataStore, changed: Set[str]):
+    """新快照发布前预建卡片、检索索引、id 索引以及各领域图谱（连同预编码的 JSON）。"""
+    _search_index(store)
+    _item_indexes(store)
+    for d in store.domains():
+        store.memo("graph_repo.domain_graph_json:" + d, lambda st, d=d: encode(_domain_graph(st, d)))
@@ -0,0 +1,168 @@
+# services/identify_jobs.py
+# -*- coding: utf-8 -*-
+"""
+识别任务：提交后立即返回 job id，由进程内的有界线程池执行 intelligent_discovery。
+
+- 任务状态存 SQLite（与抽取缓存同目录），任意 gunicorn worker 都能查询
+- 每个进程最多 IDENTIFY_WORKERS 个任务同时执行，排队 + 执行中的任务超过 IDENTIFY_QUEUE_MAX 时拒绝提交
+- 每个任务从提交起计时，超过 IDENTIFY_JOB_TIMEOUT 秒记为 timeout：排队超时直接跳过，
+  执行中由 iter_discovery 在每页 / 每块之间检查并停止（已在途的模型请求无法中断，结果丢弃）
+- 执行任务的进程中途退出时，状态停在 queued / running，查询时按超时处理
+- 超过 IDENTIFY_JOB_TTL 秒的任务记录在提交新任务时清理
+"""
+from __future__ import annotations
+import json, os, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, String, Table, Text, delete, insert, select, update
+
+from services.intelligent_discovery import iter_discovery
+from services.sqlite_util import default_db_path, open_engine
+
+WORKERS = int(os.getenv("IDENTIFY_WORKERS", "2"))
+QUEUE_MAX = int(os.getenv("IDENTIFY_QUEUE_MAX", "8"))
+JOB_TIMEOUT = float(os.getenv("IDENTIFY_JOB_TIMEOUT", "300"))
+JOB_TTL = float(os.getenv("IDENTIFY_JOB_TTL", str(24 * 3600)))
+
+QUEUED, RUNNING, DONE, ERROR, TIMEOUT = "queued", "running", "done", "error", "timeout"
+_ACTIVE = (QUEUED, RUNNING)
+
+_metadata = MetaData()
+_jobs = Table(
+    "identify_jobs", _metadata,
+    Column("id", String(32), primary_key=True),
+    Column("status", String(16), nullable=False),
+    Column("source", Text, nullable=False),
+    Column("kind", String(8)),  # text / file
+    Column("local_only", Boolean),  # NULL：交给 iter_discovery 按文本长度 / 模型可用性决定
+    Column("created_at", Float, nullable=False, index=True),
+    Column("started_at", Float),
+    Column("finished_at", Float),
+    Column("deadline", Float, nullable=False),
+    Column("chunks_done", Integer, nullable=False, default=0),
+    Column("chunks", Integer, nullable=False, default=0),
+    Column("result", Text),
+    Column("error", Text),
+)
+
+
+class QueueFull(Exception):
+    """排队任务已满，调用方应稍后重试（接口返回 429）"""
+
+
+class JobQueue:
+    def __init__(self, path: Optional[str] = None, workers: int = WORKERS, queue_max: int = QUEUE_MAX,
+                 timeout: float = JOB_TIMEOUT, ttl: float = JOB_TTL):
+        self.path = path or default_db_path("IDENTIFY_JOBS_DB", "identify_jobs.db")
+        self.timeout = timeout
+        self.ttl = ttl
+        self.queue_max = queue_max
+        self._engine = open_engine(self.path, _metadata)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="identify-job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    # ---------- 提交 ----------
+    def submit(self, source: str, timeout: Optional[float] = None, local_only: Optional[bool] = None,
+               kind: Optional[str] = None) -> str:
+        """source 为文本或已保存的文件路径（kind 为 text / file），local_only 同 iter_discovery；队列已满抛 QueueFull"""
+        with self._lock:
+            if self._pending >= self.queue_max:
+                raise QueueFull(f"too many pending jobs ({self._pending})")
+            self._pending += 1
+        try:
+            now = time.time()
+            job_id = uuid.uuid4().hex
+            with self._engine.begin() as conn:
+                conn.execute(delete(_jobs).where(_jobs.c.created_at < now - self.ttl))
+                conn.execute(insert(_jobs).values(id=job_id, status=QUEUED, source=source, kind=kind, local_only=local_only,
+                                                  created_at=now,
+                                                  deadline=now + (timeout or self.timeout)))
+            self._pool.submit(self._run, job_id)
+            return job_id
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def pending(self) -> int:
+        return self._pending
+
+    # ---------- 执行 ----------
+    def _set(self, job_id: str, **values):
+        with self._engine.begin() as conn:
+            conn.execute(update(_jobs).where(_jobs.c.id == job_id).values(**values))
+
+    def _run(self, job_id: str):
+        try:
+            with self._engine.connect() as conn:
+                row = conn.execute(select(_jobs.c.source, _jobs.c.kind, _jobs.c.local_only, _jobs.c.deadline)
+                                   .where(_jobs.c.id == job_id)).first()
+            if row is None:
+                return
+            if time.time() > row.deadline:
+                self._set(job_id, status=TIMEOUT, finished_at=time.time(), error="timeout while queued")
+                return
+            self._set(job_id, status=RUNNING, started_at=time.time())
+            events = iter_discovery(row.source, local_only=row.local_only, deadline=row.deadline,
+                                    kind=row.kind)
+            try:
+                for ev in events:
+                    if time.time() > row.deadline:
+                        self._set(job_id, status=TIMEOUT, finished_at=time.time(), error="timeout")
+                        return
+                    if ev["event"] == "progress":
+                        self._set(job_id, chunks=ev["chunks"])
+                    elif ev["event"] == "chunk":
+                        self._set(job_id, chunks_done=ev["done"], chunks=ev["chunks"])
+                    elif ev["event"] == "done":
+                        result = {k: v for k, v in ev.items() if k != "event"}
+                        self._set(job_id, status=DONE, finished_at=time.time(),
+                                  result=json.dumps(result, ensure_ascii=False))
+            finally:
+                events.close()  # 超时提前退出时取消尚未开始的块
+        except TimeoutError:
+            self._set(job_id, status=TIMEOUT, finished_at=time.time(), error="timeout")
+        except Exception as e:
+            print(f"❌ 识别任务失败 {job_id}:", e)
+            try:
+                self._set(job_id, status=ERROR, finished_at=time.time(), error=str(e))
+            except Exception:
+                pass
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    # ---------- 查询 ----------
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._engine.connect() as conn:
+            row = conn.execute(select(_jobs).where(_jobs.c.id == job_id)).first()
+        if row is None:
+            return None
+        status, error = row.status, row.error
+        if status in _ACTIVE and time.time() > row.deadline:
+            status, error = TIMEOUT, error or "timeout"
+        return {
+            "job_id": row.id,
+            "status": status,
+            "progress": {"done": row.chunks_done, "chunks": row.chunks},
+            "created_at": row.created_at,
+            "started_at": row.started_at,
+            "finished_at": row.finished_at,
+            "result": json.loads(row.result) if row.result else None,
+            "error": error,
+        }
+
+
+_QUEUE: Optional[JobQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _QUEUE
+    if _QUEUE is None:
+        with _QUEUE_LOCK:
+            if _QUEUE is None:
+                _QUEUE = JobQueue()
+    return _QUEUE
@@ -15,11 +15,24 @@
 import os
 import re
 import json
-import pdfplumber
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import FrozenSet, List, NamedTuple
+
 from docx import Document
 from dashscope import Generation
 from dotenv import load_dotenv
 
+from services.data_store import get_store, register_warmer
+from services.llm_cache import get_extraction_cache, make_key
+from services.local_matcher import LocalMatcher, build_local_matcher
+from services.term_matcher import TermMatcher
+from services import upload_store
+from services.pdf_extract import iter_pdf_pages
+from services.text_chunker import MAX_CHARS, OVERLAP, iter_chunks, split_text
+
 # 保证无论在哪运行都能找到 /app/data
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(BASE_DIR), "data")
@@ -27,10 +40,27 @@ DATA_DIR = os.path.join(os.path.dirname(BASE_DIR), "data")
 # ==================== 环境配置 ====================
 load_dotenv()  # 自动读取 .env 文件
 API_KEY = os.getenv("DASHSCOPE_API_KEY", "sk-xxxx")  # 建议放在环境变量
+MODEL_NAME = "qwen3-235b-a22b-instruct-2507"
+SAMPLING = {"temperature": 0.7, "top_p": 0.8}  # 参与缓存 key，改参数后旧缓存自然失效
+# 不超过该长度的文本只做本地词库精确匹配、不调用模型（0 表示关闭）
+LOCAL_ONLY_MAX_CHARS = int(os.getenv("LOCAL_ONLY_MAX_CHARS", "0"))
+
+
+def model_available():
+    """未配置 API Key 时只能走本地匹配"""
+    return bool(API_KEY) and API_KEY != "sk-xxxx"
+
 
 # ==================== 模型调用函数 ====================
 def call_with_messages_qwen_plus(system_prompt, prompt_text):
-    """调用 Qwen 模型"""
+    """调用 Qwen 模型；相同输入（归一化后）直接返回持久化缓存中的结果"""
+    cache = get_extraction_cache()
+    key = make_key(system_prompt, prompt_text, MODEL_NAME, SAMPLING)
+    cached = cache.get(key)
+    if cached is not None:
+        print("💾 命中抽取缓存")
+        return cached
+
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": prompt_text.strip()},
@@ -38,42 +68,71 @@ def call_with_messages_qwen_plus(system_prompt, prompt_text):
     try:
         response = Generation.call(
             api_key=API_KEY,
-            model="qwen3-235b-a22b-instruct-2507",
+            model=MODEL_NAME,
             messages=messages,
             result_format="message",
-            temperature=0.7,
-            top_p=0.8,
+            **SAMPLING,
         )
         if response.status_code != 200:
             raise Exception(f"Request failed: {response.status_code}, {response.message}")
-        return response.output.choices[0].message.content.strip()
+        content = response.output.choices[0].message.content.strip()
+        cache.put(key, MODEL_NAME, content)  # 失败时返回的 "{}" 不缓存
+        return content
     except Exception as e:
         print("❌ 调用模型失败:", e)
         return "{}"
 
 # ==================== 文件读取函数 ====================
-def extract_text_from_file(file_path):
-    ext = file_path.lower().split(".")[-1]
+def _iter_file_pieces(file_path):
+    # 按文件头判断类型，识别不出再看扩展名
+    ext = upload_store.sniff_file(file_path) or file_path.lower().split(".")[-1]
     if ext == "txt":
         with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
+            for piece in iter(lambda: f.read(upload_store.COPY_CHUNK), ""):
+                yield piece
     elif ext == "pdf":
-        text = ""
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        return text
+        for page_text in iter_pdf_pages(file_path):
+            if page_text:
+                yield page_text + "\n"
     elif ext == "docx":
         doc = Document(file_path)
-        return "\n".join([p.text for p in doc.paragraphs])
+        yield "\n".join([p.text for p in doc.paragraphs])
     else:
         raise ValueError(f"Unsupported file type: {ext}")
 
+
+def iter_text_from_file(file_path):
+    """
+    逐段产出文件文本：PDF 按页（进程池并行解析），其他格式整篇一段。
+    按文件内容 sha256 缓存抽取结果（压缩存放在上传目录），同一文件再次识别时不再解析。
+    """
+    digest = upload_store.digest_of(file_path)
+    cached = upload_store.load_pieces(digest)
+    if cached is not None:
+        print("💾 命中文件文本缓存")
+        yield from cached
+        return
+    writer = upload_store.PieceWriter(digest)
+    try:
+        for piece in _iter_file_pieces(file_path):
+            writer.write(piece)
+            yield piece
+        writer.commit()
+    finally:
+        writer.discard()
+
+
+def extract_text_from_file(file_path):
+    return "".join(iter_text_from_file(file_path))
+
 # ==================== 词库加载函数 ====================
 def load_rank_tables(json_folder):
-    """加载 rank_table_*.json 文件"""
+    """加载 rank_table_*.json 文件（默认数据目录直接复用 data_store 已解析的数据）"""
+    if os.path.realpath(json_folder) == os.path.realpath(DATA_DIR):
+        rank_data = [row for rk in get_store().ranks for row in rk.rows]
+        print(f"📚 载入标准词库 {len(rank_data)} 条")
+        return rank_data
+
     rank_data = []
     for file_name in os.listdir(json_folder):
         if file_name.startswith("rank_table_") and file_name.endswith(".json"):
@@ -86,40 +145,62 @@ def load_rank_tables(json_folder):
     print(f"📚 载入标准词库 {len(rank_data)} 条")
     return rank_data
 
-# ==================== 模糊匹配标准化函数 ====================
-def normalize_terms(extracted_words, key_words):
-    """模糊匹配模型抽取结果与标准词库"""
-    from rapidfuzz import fuzz
-
-    normalized = []
-    for word in extracted_words:
-        word_low = word.lower()
-        best = None
-        best_score = 0
-        for key in key_words:
-            score = fuzz.partial_ratio(word_low, key.lower())
-            if score > best_score:
-                best_score = score
-                best = key
-        if best and best_score >= 70:
-            normalized.append(best)
-        else:
-            normalized.append(word)
-    return list(dict.fromkeys(normalized))
+class TermDictionary(NamedTuple):
+    """标准词库：列表保留文件顺序（模糊匹配同分取靠前），集合用于成员判断，匹配器预构建。"""
+    tech_words: List[str]
+    product_words: List[str]
+    tech_set: FrozenSet[str]
+    product_set: FrozenSet[str]
+    tech_matcher: TermMatcher
+    product_matcher: TermMatcher
+    local: LocalMatcher  # 名称 / 别名精确匹配（Aho–Corasick）
 
-# ==================== 核心函数 ====================
-def intelligent_discovery(input_text_or_file, json_folder):
-    """主逻辑：文件或文本输入 → 模型抽取 → 匹配词库 → 返回结果"""
 
-    # ---------- 1️⃣ 读取文本 ----------
-    if os.path.exists(input_text_or_file):
-        content = extract_text_from_file(input_text_or_file)
-    else:
-        content = input_text_or_file
-    print("📥 输入内容长度:", len(content))
+def _build_term_dictionary(rank_entries, aliases=None) -> TermDictionary:
+    key_tech_words = [item['name'] for item in rank_entries if item.get("type") == "技术"]
+    key_product_words = [item['name'] for item in rank_entries if item.get("type") == "产品"]
+    return TermDictionary(
+        key_tech_words, key_product_words,
+        frozenset(key_tech_words), frozenset(key_product_words),
+        TermMatcher(key_tech_words), TermMatcher(key_product_words),
+        build_local_matcher(rank_entries, aliases),
+    )
+
+
+def _store_term_dictionary(store) -> TermDictionary:
+    # 关系图里与 rank 同 id、但名称不同的节点名作为别名
+    aliases = {}
+    for rel in store.relations:
+        for node in rel.nodes:
+            row = store.rank_by_id.get(node.get("id"))
+            if row and node.get("name") and node["name"] != row.get("name"):
+                aliases.setdefault(row.get("id"), []).append(node["name"])
+    return _build_term_dictionary([row for rk in store.ranks for row in rk.rows], aliases)
+
+
+def load_term_dictionary(json_folder=None) -> TermDictionary:
+    """
+    标准词库。默认数据目录（含 None、"data"、"/app/data" 这类指向同一目录或目录不存在的写法）
+    用 data_store 快照上的同一份缓存，数据文件变化时随快照重建；其他目录按需现读。
+    """
+    if json_folder is None or not os.path.isdir(json_folder) \
+            or os.path.realpath(json_folder) == os.path.realpath(DATA_DIR):
+        return get_store().memo("intelligent_discovery.terms", _store_term_dictionary)
+    return _build_term_dictionary(load_rank_tables(json_folder))
+
+
+@register_warmer
+def _warm(store, changed):
+    store.memo("intelligent_discovery.terms", _store_term_dictionary)
+
+# ==================== 模糊匹配标准化函数 ====================
+def normalize_terms(extracted_words, key_words):
+    """模糊匹配模型抽取结果与标准词库（key_words 可传词列表或预构建的 TermMatcher）"""
+    matcher = key_words if isinstance(key_words, TermMatcher) else TermMatcher(key_words)
+    return matcher.normalize(extracted_words)
 
-    # ---------- 2️⃣ 调用模型 ----------
-    system_prompt = """
+# ==================== 分块抽取 ====================
+SYSTEM_PROMPT = """
         你是一个智能技术发现助手。
         请从以下文本中抽取技术词（如方法、算法、材料、技术名称）和产品词（如设备、工具、产品型号）。
         请只输出 JSON 格式，不要多余解释。格式如下：
@@ -129,10 +210,23 @@ def intelligent_discovery(input_text_or_file, json_folder):
         }
             """
 
-    raw_output = call_with_messages_qwen_plus(system_prompt, content)
-    print("🧠 模型原始输出 >>>", raw_output)
+# 同时在途的模型请求数（进程内所有识别请求共用）
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _llm_pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ThreadPoolExecutor(max_workers=max(1, LLM_CONCURRENCY), thread_name_prefix="llm")
+    return _POOL
 
-    # ---------- 3️⃣ 解析模型返回 ----------
+
+def parse_extraction(raw_output):
+    """从模型输出中解析出 (技术词列表, 产品词列表)"""
     extraction_json = {"all_tech_words": [], "all_product_words": []}
     try:
         match = re.search(r"\{[\s\S]*\}", raw_output)
@@ -143,39 +237,204 @@ def intelligent_discovery(input_text_or_file, json_folder):
     except Exception as e:
         print("❌ JSON解析失败:", e)
         print("⚠️ 原始输出:", raw_output)
+    return (list(extraction_json.get("all_tech_words", []) or []),
+            list(extraction_json.get("all_product_words", []) or []))
 
-    all_tech_words = extraction_json.get("all_tech_words", [])
-    all_product_words = extraction_json.get("all_product_words", [])
-    print("🎯 抽取结果：", all_tech_words, all_product_words)
 
-    # ---------- 4️⃣ 加载词库 ----------
-    rank_entries = load_rank_tables(json_folder)
-    key_tech_words = [item['name'] for item in rank_entries if item.get("type") == "技术"]
-    key_product_words = [item['name'] for item in rank_entries if item.get("type") == "产品"]
+def _extract_chunk(chunk):
+    raw_output = call_with_messages_qwen_plus(SYSTEM_PROMPT, chunk)
+    print("🧠 模型原始输出 >>>", raw_output)
+    return parse_extraction(raw_output)
 
-    # ---------- 5️⃣ 模糊匹配 ----------
-    normalized_tech = normalize_terms(all_tech_words, key_tech_words)
-    normalized_product = normalize_terms(all_product_words, key_product_words)
 
-    key_tech_found = [w for w in normalized_tech if w in key_tech_words]
-    key_products_found = [w for w in normalized_product if w in key_product_words]
+def _submit_chunks(chunks):
+    """逐块提交抽取（chunks 可以是边解析边产出的生成器），返回按块顺序的 future 列表"""
+    return [_llm_pool().submit(_extract_chunk, c) for c in chunks]
 
-    # ---------- 6️⃣ 输出 ----------
-    print("✅ 匹配到的关键技术:", key_tech_found)
-    print("✅ 匹配到的关键产品:", key_products_found)
 
+def _iter_completed(futures):
+    """按完成先后产出 (块序号, 技术词, 产品词)；并发度受 LLM_CONCURRENCY 限制"""
+    if len(futures) > 1:
+        print(f"✂️ 文本切分为 {len(futures)} 块")
+    index = {fut: i for i, fut in enumerate(futures)}
+    for fut in as_completed(futures):
+        tech, prod = fut.result()
+        yield index[fut], tech, prod
+
+
+def _cancel(futures):
+    # 调用方提前停止迭代（如客户端断开、任务超时）时，取消尚未开始的块
+    for fut in futures:
+        fut.cancel()
+
+
+def iter_chunk_extractions(content, max_chars=MAX_CHARS, overlap=OVERLAP):
+    """
+    切块后并发抽取，按完成先后逐块产出 (块序号, 块总数, 技术词, 产品词)。
+    总耗时取决于最慢的一块而不是文档长度。
+    """
+    futures = _submit_chunks(split_text(content, max_chars, overlap))
+    try:
+        for i, tech, prod in _iter_completed(futures):
+            yield i, len(futures), tech, prod
+    finally:
+        _cancel(futures)
+
+
+def merge_words(per_chunk):
+    """按块顺序合并各块的词表，保序去重"""
+    return list(dict.fromkeys(w for words in per_chunk for w in words))
+
+
+def match_terms(all_tech_words, all_product_words, terms):
+    """模糊匹配到标准词库，返回识别结果结构"""
+    normalized_tech = normalize_terms(all_tech_words, terms.tech_matcher)
+    normalized_product = normalize_terms(all_product_words, terms.product_matcher)
     return {
         "all_tech_words": normalized_tech,
         "all_product_words": normalized_product,
-        "key_tech_found": key_tech_found,
-        "key_products_found": key_products_found,
+        "key_tech_found": [w for w in normalized_tech if w in terms.tech_set],
+        "key_products_found": [w for w in normalized_product if w in terms.product_set],
     }
 
+
+# 输入类型：接口按请求的 mode 显式传入；None 时按路径是否存在推断（仅供脚本 / 命令行直接调用）
+SOURCE_TEXT, SOURCE_FILE = "text", "file"
+
+
+def _is_file(input_text_or_file, kind=None):
+    if kind is not None:
+        return kind == SOURCE_FILE
+    return os.path.exists(input_text_or_file)
+
+
+def iter_input(input_text_or_file, kind=None):
+    if _is_file(input_text_or_file, kind):
+        yield from iter_text_from_file(input_text_or_file)
+    else:
+        yield input_text_or_file
+
+
+def read_input(input_text_or_file, kind=None):
+    return "".join(iter_input(input_text_or_file, kind))
+
+
+# ==================== 核心函数 ====================
+def _local_result(tech, prod):
+    return {"all_tech_words": list(tech), "all_product_words": list(prod),
+            "key_tech_found": list(tech), "key_products_found": list(prod)}
+
+
+def _with_local(result, local_tech, local_prod):
+    """模型结果后追加本地精确命中（去重）"""
+    merged = {}
+    for k, extra in (("all_tech_words", local_tech), ("all_product_words", local_prod),
+                     ("key_tech_found", local_tech), ("key_products_found", local_prod)):
+        merged[k] = list(dict.fromkeys([*result[k], *extra]))
+    return merged
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.time() > deadline:
+        raise TimeoutError("identify deadline exceeded")
+
+
+def iter_discovery(input_text_or_file, json_folder=None, local_only=None, deadline=None, kind=None):
+    """
+    流式识别：逐步产出事件 dict，供流式接口边算边推送。
+    - {"event": "start", "local_only"}：开始解析输入之前产出
+    - {"event": "chunk", "index", "done", "chunks", **该块的识别结果}：每块抽取完成即产出；
+      输入还在解析时也会产出，此时 chunks 为已提交的块数
+    - {"event": "progress", "chars", "chunks"}：输入解析完毕，chunks 为最终块数
+    - {"event": "local", **本地精确匹配结果}：词库名称 / 别名在原文中的直接命中，不等模型
+    - {"event": "done", **最终结果}：全部块按块顺序合并去重后再匹配，并追加本地命中，即 intelligent_discovery 的返回值
+    识别结果字段为 all_tech_words / all_product_words / key_tech_found / key_products_found。
+
+    local_only：True 只做本地匹配；None 时文本不超过 LOCAL_ONLY_MAX_CHARS 或未配置模型也只做本地匹配。
+    kind：SOURCE_TEXT / SOURCE_FILE，说明输入是文本还是已保存的文件路径。
+    deadline：time.time() 时间戳；解析每页、提交每块、等待模型时检查，超过后抛 TimeoutError 并取消未开始的块。
+    """
+    # ---------- 4️⃣ 加载词库（进程内缓存，数据文件变化时才重建） ----------
+    terms = load_term_dictionary(json_folder)
+    scanner = terms.local.scanner()
+
+    use_model = not local_only and model_available()
+    if local_only is None and LOCAL_ONLY_MAX_CHARS and not _is_file(input_text_or_file, kind) \
+            and len(input_text_or_file) <= LOCAL_ONLY_MAX_CHARS:
+        use_model = False
+    yield {"event": "start", "local_only": not use_model}
+
+    # ---------- 1️⃣ 读取文本（PDF 逐页解析，攒够一块就先交给模型，不等全文） ----------
+    chars = 0
+
+    def pieces():
+        nonlocal chars
+        for piece in iter_input(input_text_or_file, kind):
+            _check_deadline(deadline)
+            chars += len(piece)
+            scanner.feed(piece)
+            yield piece
+
+    futures = []
+    pending = {}  # 尚未产出结果的 future -> 块序号
+    tech_by_chunk, prod_by_chunk = {}, {}
+
+    # ---------- 3️⃣ 解析模型返回 + 5️⃣ 逐块匹配 ----------
+    def chunk_events(done_futures):
+        for fut in done_futures:
+            i = pending.pop(fut)
+            tech_by_chunk[i], prod_by_chunk[i] = fut.result()
+            yield {"event": "chunk", "index": i, "done": len(tech_by_chunk), "chunks": len(futures),
+                   **match_terms(tech_by_chunk[i], prod_by_chunk[i], terms)}
+
+    try:
+        # ---------- 2️⃣ 调用模型（长文本分块并发，边解析边提交，先完成的块先产出） ----------
+        if use_model:
+            for chunk in iter_chunks(pieces()):
+                fut = _llm_pool().submit(_extract_chunk, chunk)
+                futures.append(fut)
+                pending[fut] = len(futures) - 1
+                yield from chunk_events([f for f in pending if f.done()])
+        else:
+            for _ in pieces():
+                pass
+        local_tech, local_prod = scanner.finish()
+        print("📥 输入内容长度:", chars)
+        if len(futures) > 1:
+            print(f"✂️ 文本切分为 {len(futures)} 块")
+        yield {"event": "progress", "chars": chars, "chunks": len(futures)}
+        yield {"event": "local", **_local_result(local_tech, local_prod)}
+        timeout = None if deadline is None else max(0.0, deadline - time.time())
+        try:
+            yield from chunk_events(as_completed(list(pending), timeout=timeout))
+        except FuturesTimeout:
+            raise TimeoutError("identify deadline exceeded") from None
+    finally:
+        _cancel(futures)
+
+    order = sorted(tech_by_chunk)
+    all_tech_words = merge_words(tech_by_chunk[i] for i in order)
+    all_product_words = merge_words(prod_by_chunk[i] for i in order)
+    print("🎯 抽取结果：", all_tech_words, all_product_words)
+    result = _with_local(match_terms(all_tech_words, all_product_words, terms), local_tech, local_prod)
+
+    # ---------- 6️⃣ 输出 ----------
+    print("✅ 匹配到的关键技术:", result["key_tech_found"])
+    print("✅ 匹配到的关键产品:", result["key_products_found"])
+    yield {"event": "done", **result}
+
+
+def intelligent_discovery(input_text_or_file, json_folder=None, local_only=None, kind=None):
+    """主逻辑：文件或文本输入 → 本地精确匹配 + 分块并发模型抽取 → 匹配词库 → 返回结果"""
+    for ev in iter_discovery(input_text_or_file, json_folder, local_only, kind=kind):
+        if ev["event"] == "done":
+            return {k: v for k, v in ev.items() if k != "event"}
+
 # ==================== 独立测试入口 ====================
 if __name__ == "__main__":
     test_text = (
         "本文提出了一种基于图神经网络(GNN)的推荐算法，并开发了OCR识别系统。"
         "此外还使用多模态Transformer进行图像-文本联合分析。"
     )
-    res = intelligent_discovery(test_text, "data")
+    res = intelligent_discovery(test_text)
     print(json.dumps(res, ensure_ascii=False, indent=2))
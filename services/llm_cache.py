@@ -0,0 +1,154 @@
+# services/llm_cache.py
+# -*- coding: utf-8 -*-
+"""
+大模型抽取结果缓存（SQLite，多个 gunicorn worker 共用一个文件）。
+
+key = sha256(归一化后的输入文本 + system prompt + 模型名 + 采样参数)，value 为模型原始输出。
+- TTL：超过 LLM_CACHE_TTL 秒的条目视为过期
+- 容量：条目数超过 LLM_CACHE_MAX_ENTRIES 或总字节数超过 LLM_CACHE_MAX_BYTES 时按最近访问时间淘汰
+- 命中 / 未命中 / 淘汰计数（进程内），见 stats()
+缓存库不可用时只打印日志并退化为不缓存，不影响识别流程。
+"""
+from __future__ import annotations
+import hashlib, json, os, re, threading, time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, delete, func, insert, select, update
+
+from services.sqlite_util import default_db_path, open_engine
+
+TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_WS_RE = re.compile(r"\s+")
+
+_metadata = MetaData()
+_entries = Table(
+    "llm_cache", _metadata,
+    Column("key", String(64), primary_key=True),
+    Column("model", String(128), nullable=False),
+    Column("response", Text, nullable=False),
+    Column("size", Integer, nullable=False),
+    Column("created_at", Float, nullable=False, index=True),
+    Column("last_access", Float, nullable=False, index=True),
+)
+
+
+def normalize_text(s: str) -> str:
+    """空白折叠 + 去首尾空白：仅排版不同的同一份文本命中同一条缓存。"""
+    return _WS_RE.sub(" ", s or "").strip()
+
+
+def make_key(system_prompt: str, text: str, model: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps({
+        "system": normalize_text(system_prompt),
+        "text": normalize_text(text),
+        "model": model,
+        "params": params,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, path: Optional[str] = None, ttl: float = TTL_SECONDS,
+                 max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.path = path or default_db_path("LLM_CACHE_DB", "llm_cache.db")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._engine = None
+        try:
+            self._engine = open_engine(self.path, _metadata)
+        except Exception as e:
+            print("⚠️ 抽取缓存不可用，将不缓存:", e)
+
+    @property
+    def enabled(self) -> bool:
+        return self._engine is not None
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._engine.begin() as conn:
+                row = conn.execute(select(_entries.c.response, _entries.c.created_at)
+                                   .where(_entries.c.key == key)).first()
+                if row is not None and now - row.created_at > self.ttl:
+                    conn.execute(delete(_entries).where(_entries.c.key == key))
+                    row = None
+                if row is not None:
+                    conn.execute(update(_entries).where(_entries.c.key == key).values(last_access=now))
+        except Exception as e:
+            print("⚠️ 读取抽取缓存失败:", e)
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row.response if row is not None else None
+
+    def put(self, key: str, model: str, response: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(delete(_entries).where(_entries.c.key == key))
+                conn.execute(insert(_entries).values(key=key, model=model, response=response, size=size,
+                                                     created_at=now, last_access=now))
+                self._evict(conn, now)
+        except Exception as e:
+            print("⚠️ 写入抽取缓存失败:", e)
+
+    def _evict(self, conn, now: float):
+        n = conn.execute(delete(_entries).where(_entries.c.created_at < now - self.ttl)).rowcount or 0
+        count, total = conn.execute(select(func.count(), func.coalesce(func.sum(_entries.c.size), 0))).one()
+        if count > self.max_entries or total > self.max_bytes:
+            # 从最久未访问的开始删，直到两个上限都满足
+            drop, over_n, over_b = [], count - self.max_entries, total - self.max_bytes
+            for key, size in conn.execute(select(_entries.c.key, _entries.c.size)
+                                          .order_by(_entries.c.last_access.asc())):
+                if over_n <= 0 and over_b <= 0:
+                    break
+                drop.append(key)
+                over_n -= 1
+                over_b -= size
+            if drop:
+                conn.execute(delete(_entries).where(_entries.c.key.in_(drop)))
+                n += len(drop)
+        if n:
+            with self._lock:
+                self.evictions += n
+
+    def clear(self):
+        if self.enabled:
+            with self._engine.begin() as conn:
+                conn.execute(delete(_entries))
+
+    def stats(self) -> Dict[str, Any]:
+        out = {"enabled": self.enabled, "path": self.path,
+               "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+        if self.enabled:
+            with self._engine.connect() as conn:
+                out["entries"], out["bytes"] = conn.execute(
+                    select(func.count(), func.coalesce(func.sum(_entries.c.size), 0))).one()
+        return out
+
+
+_CACHE: Optional[ExtractionCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = ExtractionCache()
+    return _CACHE
@@ -0,0 +1,173 @@
+# services/local_matcher.py
+# -*- coding: utf-8 -*-
+"""
+本地精确匹配：在输入文本中直接查找标准词库里的名称 / 别名（Aho–Corasick 自动机，线性时间扫描）。
+
+- 模式串与文本都做 NFKC + 小写归一化
+- 纯 ASCII 字母数字结尾 / 开头的模式要求在文本中处于词边界，避免 "Sora" 命中 "Soraya"、"GPT-4" 命中 "GPT-4o"
+- 命中按在文本中首次出现的顺序返回标准名，去重
+- LocalScanner 支持按段喂入（如 PDF 逐页），段与段之间保留尾部重叠，跨段的名称也能命中
+"""
+from __future__ import annotations
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MIN_PATTERN_LEN = 2
+
+
+def norm(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+class AhoCorasick:
+    """
+    多模式串自动机。goto 表为每个状态一个 dict（char -> 状态），fail 为失败指针，
+    out[s] 为在状态 s 结束的模式下标（已沿失败链合并）。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[int, ...]] = [()]
+        outs: List[List[int]] = [[]]
+        for pid, p in enumerate(patterns):
+            self.patterns.append(p)
+            s = 0
+            for ch in p:
+                nxt = self.goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[s][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    outs.append([])
+                s = nxt
+            outs[s].append(pid)
+
+        # BFS 建失败指针
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            s = queue[head]
+            head += 1
+            for ch, nxt in self.goto[s].items():
+                queue.append(nxt)
+                f = self.fail[s]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                outs[nxt].extend(outs[self.fail[nxt]])
+        self.out = [tuple(o) for o in outs]
+        self.max_len = max((len(p) for p in self.patterns), default=0)
+
+    def iter(self, text: str):
+        """产出 (结束位置, 模式下标)；结束位置为匹配最后一个字符的下标"""
+        goto, fail, out = self.goto, self.fail, self.out
+        s = 0
+        for i, ch in enumerate(text):
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                for pid in out[s]:
+                    yield i, pid
+
+
+class LocalMatcher:
+    """标准词库名称 / 别名 → (类型, 标准名) 的精确匹配器；词库不变时可复用"""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]]):
+        """entries: (模式串, 类型 "技术"/"产品", 标准名)"""
+        targets: Dict[str, List[Tuple[str, str]]] = {}
+        for pattern, type_, name in entries:
+            p = norm(pattern).strip()
+            if len(p) < MIN_PATTERN_LEN:
+                continue
+            lst = targets.setdefault(p, [])
+            if (type_, name) not in lst:
+                lst.append((type_, name))
+        keys = list(targets)
+        self.targets: List[List[Tuple[str, str]]] = [targets[k] for k in keys]
+        self._left = [_is_word(k[0]) for k in keys]
+        self._right = [_is_word(k[-1]) for k in keys]
+        self.automaton = AhoCorasick(keys)
+
+    def _hits(self, text: str, final: bool = True) -> List[Tuple[int, str, str]]:
+        """(起始位置, 类型, 标准名)；final=False 时不报告贴着文本末尾、右边界还无法判定的匹配"""
+        out = []
+        n = len(text)
+        for end, pid in self.automaton.iter(text):
+            start = end - len(self.automaton.patterns[pid]) + 1
+            if self._left[pid] and start > 0 and _is_word(text[start - 1]):
+                continue
+            if self._right[pid]:
+                if end + 1 < n:
+                    if _is_word(text[end + 1]):
+                        continue
+                elif not final:
+                    continue
+            for type_, name in self.targets[pid]:
+                out.append((start, type_, name))
+        return out
+
+    def scan(self, text: str) -> Tuple[List[str], List[str]]:
+        """返回 (命中的技术标准名, 命中的产品标准名)，按首次出现顺序去重"""
+        sc = self.scanner()
+        sc.feed(text)
+        return sc.finish()
+
+    def scanner(self) -> "LocalScanner":
+        return LocalScanner(self)
+
+
+class LocalScanner:
+    """分段扫描：每段与上一段末尾 max_len 个字符拼接后扫描，命中按全文位置排序去重"""
+
+    def __init__(self, matcher: LocalMatcher):
+        self.m = matcher
+        self._tail = ""
+        self._offset = 0  # _tail 在全文（归一化后）中的起始位置
+        self._first: Dict[Tuple[str, str], int] = {}
+
+    def _collect(self, buf: str, final: bool):
+        for start, type_, name in self.m._hits(buf, final):
+            if start == 0 and self._offset:
+                # 从保留尾部开头起的匹配已在上一段里带着左侧字符判定过，这里缺左侧字符，跳过
+                continue
+            pos = self._offset + start
+            key = (type_, name)
+            if key not in self._first or pos < self._first[key]:
+                self._first[key] = pos
+
+    def feed(self, piece: str):
+        buf = self._tail + norm(piece)
+        self._collect(buf, final=False)
+        # 保留的尾部要能覆盖最长模式 + 左边界判断所需的 1 个字符
+        keep = min(len(buf), self.m.automaton.max_len + 1)
+        self._offset += len(buf) - keep
+        self._tail = buf[len(buf) - keep:]
+
+    def finish(self) -> Tuple[List[str], List[str]]:
+        self._collect(self._tail, final=True)
+        ordered = sorted(self._first.items(), key=lambda kv: kv[1])
+        tech = [name for (t, name), _ in ordered if t == "技术"]
+        prod = [name for (t, name), _ in ordered if t == "产品"]
+        return tech, prod
+
+
+def build_local_matcher(rank_entries, aliases: Optional[Dict[str, List[str]]] = None) -> LocalMatcher:
+    """rank_entries：rank_table 行；aliases：rank id -> 其他名称（如关系图里的节点名）"""
+    entries = []
+    for row in rank_entries:
+        t, name = row.get("type"), row.get("name")
+        if t not in ("技术", "产品") or not name:
+            continue
+        entries.append((name, t, name))
+        for a in (aliases or {}).get(row.get("id"), ()):
+            entries.append((a, t, name))
+    return LocalMatcher(entries)
@@ -0,0 +1,113 @@
+# services/pdf_extract.py
+# -*- coding: utf-8 -*-
+"""
+PDF 文本抽取：按页区间分给进程池并行解析，按页序逐页产出文本（生成器）。
+
+- 快路径 pypdfium2；某个页区间用 pypdfium2 失败时，该区间改用 pdfplumber
+- 预算：文件超过 PDF_MAX_BYTES 直接拒绝；只解析前 PDF_MAX_PAGES 页
+- 页数不超过一个区间时在当前进程直接解析，避免进程池开销
+- 进程池用 spawn 启动（gunicorn gthread worker 是多线程进程，fork 不安全），每个进程一个，懒创建
+"""
+from __future__ import annotations
+import multiprocessing, os, threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+import pdfplumber
+import pypdfium2 as pdfium
+
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(50 * 1024 * 1024)))
+WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+class PdfBudgetError(ValueError):
+    """PDF 超出解析预算"""
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ProcessPoolExecutor(max_workers=max(1, WORKERS),
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def _pdfium_range(path: str, start: int, stop: int) -> List[str]:
+    pdf = pdfium.PdfDocument(path)
+    try:
+        out = []
+        for i in range(start, stop):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                # 不用 get_text_bounded：它会裁掉超出页面框的字符，与 pdfplumber 结果不一致
+                out.append(textpage.get_text_range(force_this=True).replace("\r\n", "\n"))
+            finally:
+                textpage.close()
+                page.close()
+        return out
+    finally:
+        pdf.close()
+
+
+def _plumber_range(path: str, start: int, stop: int) -> List[str]:
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def extract_range(path: str, start: int, stop: int) -> List[str]:
+    """解析 [start, stop) 页，返回每页文本（进程池任务入口）"""
+    try:
+        return _pdfium_range(path, start, stop)
+    except Exception as e:
+        print(f"⚠️ pypdfium2 解析第 {start + 1}-{stop} 页失败，改用 pdfplumber:", e)
+        return _plumber_range(path, start, stop)
+
+
+def page_count(path: str) -> int:
+    try:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception:
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+
+
+def iter_pdf_pages(path: str, max_pages: int = MAX_PAGES, max_bytes: int = MAX_BYTES,
+                   pages_per_task: int = PAGES_PER_TASK) -> Iterator[str]:
+    """按页序逐页产出文本；调用方提前停止迭代时，尚未开始的页区间会被取消"""
+    size = os.path.getsize(path)
+    if max_bytes and size > max_bytes:
+        raise PdfBudgetError(f"PDF too large: {size} bytes > {max_bytes}")
+    n = page_count(path)
+    if max_pages and n > max_pages:
+        print(f"⚠️ PDF 共 {n} 页，仅解析前 {max_pages} 页")
+        n = max_pages
+    if n <= pages_per_task:
+        yield from extract_range(path, 0, n)
+        return
+
+    pool = _pool()
+    futures = [pool.submit(extract_range, path, s, min(s + pages_per_task, n))
+               for s in range(0, n, pages_per_task)]
+    try:
+        for fut in futures:
+            yield from fut.result()
+    finally:
+        for fut in futures:
+            fut.cancel()
+
+
+def extract_pdf_text(path: str, **kw) -> str:
+    """整份 PDF 文本：非空页各占一段，页尾加换行"""
+    return "".join(t + "\n" for t in iter_pdf_pages(path, **kw) if t)
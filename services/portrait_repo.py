@@ -1,41 +1,16 @@
 # services/portrait_repo.py
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import os, json
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Optional, Mapping, NamedTuple
 
-ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(ROOT_DIR, "data")
+from services import data_store
+from services.data_store import norm_id
+from services.graph_layout import domain_layout
+from services.json_codec import Encoded, encode
 
 # 允许的领域
 _DOMAIN_KEYS = {"brain", "chip", "dialogue", "dl", "robot", "video"}
 
-def _p(*parts) -> str:
-    return os.path.join(*parts)
-
-def _load_json(path: str) -> Any:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
-
-def _files_for(domain: str) -> Tuple[str, str]:
-    d = (domain or "").strip().lower()
-    if d not in _DOMAIN_KEYS:
-        raise ValueError(f"unknown domain: {domain}")
-    return _p(DATA_DIR, f"relation_{d}.json"), _p(DATA_DIR, f"rank_table_{d}.json")
-
-def _detail_map(detail_path: str) -> Dict[str, Dict[str, Any]]:
-    m: Dict[str, Dict[str, Any]] = {}
-    data = _load_json(detail_path) or []
-    if isinstance(data, list):
-        for rec in data:
-            did = str(rec.get("id") or "").strip()
-            if did:
-                m[did] = rec
-    return m
-
 def _kind_from_type(t: str) -> str:
     t = (t or "").strip()
     if t in ("技术", "tech", "Technology"):
@@ -54,31 +29,35 @@ def _short(s: str, n: int = 140) -> str:
     s = str(s).strip()
     return s if len(s) <= n else s[:n].rstrip() + "…"
 
-def load_graph_for_domain(domain: str) -> Dict[str, Any]:
-    """
-    返回：
-    {
-      "nodes": [{id,name,kind,desc}],  # desc 来自 rank_table_*.json 的 abstract（截断）
-      "edges": [{source,target,label}]
-    }
-    """
-    rel_path, det_path = _files_for(domain)
-    rel = _load_json(rel_path) or {}
-    nodes = rel.get("nodes") or rel.get("Nodes") or []
-    edges = rel.get("edges") or rel.get("Edges") or rel.get("links") or []
-
-    id2detail = _detail_map(det_path)
+# ---------------- 按领域缓存 ----------------
+# 条目挂在 data_store 快照上（memo key=("portrait", 领域)），该领域的 relation / rank 文件
+# 变化时随新快照重建，其他领域文件变化时沿用。文件变化由 data_store 的后台 watcher 发现，
+# 请求里不做 stat / 重新加载。
+class _DomainEntry(NamedTuple):
+    node_by_id: Mapping[str, Dict[str, Any]]      # str(id) -> relation 节点（首个）
+    id2detail: Mapping[str, Dict[str, Any]]       # rank id -> 详情
+    graph: Dict[str, Any]                         # load_graph_for_domain 的返回值
+    graph_json: Encoded                           # graph 的预编码 JSON
+
+def _check_domain(domain: str) -> str:
+    d = (domain or "").strip().lower()
+    if d not in _DOMAIN_KEYS:
+        raise ValueError(f"unknown domain: {domain}")
+    return d
 
+def _render_graph(nodes, edges, id2detail, layout=None) -> Dict[str, Any]:
+    layout = layout or {}
     out_nodes: List[Dict[str, Any]] = []
     for n in nodes:
         nid   = n.get("id")
         name  = n.get("name") or nid
         kind  = _kind_from_type(n.get("type"))
-        det   = id2detail.get(str(nid))
+        det   = id2detail.get(norm_id(nid))
         desc  = _short((det or {}).get("abstract") or n.get("abstract") or "")
-        out_nodes.append({
-            "id": nid, "name": name, "kind": kind, "desc": desc
-        })
+        node = {"id": nid, "name": name, "kind": kind, "desc": desc}
+        if nid in layout:
+            node["x"], node["y"] = layout[nid]
+        out_nodes.append(node)
 
     out_edges: List[Dict[str, Any]] = []
     for e in edges:
@@ -90,31 +69,64 @@ def load_graph_for_domain(domain: str) -> Dict[str, Any]:
 
     return {"nodes": out_nodes, "edges": out_edges}
 
+def _build_entry(store: data_store.DataStore, d: str) -> _DomainEntry:
+    rel, rank = store.relation(d), store.rank(d)
+    nodes = rel.nodes if rel else ()
+    edges = rel.edges if rel else ()
+    id2detail = rank.by_id if rank else {}
+    node_by_id: Dict[str, Dict[str, Any]] = {}
+    for n in nodes:
+        node_by_id.setdefault(str(n.get("id")), n)
+    layout = domain_layout(store, d)
+    graph = _render_graph(nodes, edges, id2detail, layout)
+    return _DomainEntry(node_by_id, id2detail, graph, encode(graph))
+
+def _entry(domain: str) -> _DomainEntry:
+    d = _check_domain(domain)
+    return data_store.get_store().memo(("portrait", d), lambda st: _build_entry(st, d))
+
+@data_store.register_warmer
+def _warm(store: data_store.DataStore, changed):
+    for d in sorted(_DOMAIN_KEYS):
+        store.memo(("portrait", d), lambda st, d=d: _build_entry(st, d))
+
+def load_graph_for_domain(domain: str) -> Dict[str, Any]:
+    """
+    返回：
+    {
+      "nodes": [{id,name,kind,desc,x,y}],  # desc 来自 rank_table_*.json 的 abstract（截断）；x/y 为服务端布局坐标
+      "edges": [{source,target,label}]
+    }
+    结果随数据快照缓存，调用方不要原地修改。
+    """
+    return _entry(domain).graph
+
+def load_graph_for_domain_json(domain: str) -> Encoded:
+    """load_graph_for_domain 的预编码 JSON（/api/portrait_graph 用）"""
+    return _entry(domain).graph_json
+
 def load_node_detail(domain: str, node_id: str) -> Optional[Dict[str, Any]]:
     """
     合并 relation 节点 + rank_table 详情（以 rank 为主）
     """
-    rel_path, det_path = _files_for(domain)
-    rel = _load_json(rel_path) or {}
-    id2detail = _detail_map(det_path)
+    ent = _entry(domain)
 
-    det = id2detail.get(str(node_id))
+    det = ent.id2detail.get(norm_id(node_id))
     if det:
         return det
 
     # 回退：relation 里的节点
-    nodes = rel.get("nodes") or rel.get("Nodes") or []
-    for n in nodes:
-        if str(n.get("id")) == str(node_id):
-            return {
-                "id": n.get("id"),
-                "name": n.get("name") or n.get("id"),
-                "type": n.get("type"),
-                "field": n.get("field") or "",
-                "country": n.get("country") or "",
-                "enterprise": n.get("enterprise") or "",
-                "year": n.get("year") or "",
-                "abstract": n.get("abstract") or "",
-                "source": []
-            }
+    n = ent.node_by_id.get(str(node_id))
+    if n is not None:
+        return {
+            "id": n.get("id"),
+            "name": n.get("name") or n.get("id"),
+            "type": n.get("type"),
+            "field": n.get("field") or "",
+            "country": n.get("country") or "",
+            "enterprise": n.get("enterprise") or "",
+            "year": n.get("year") or "",
+            "abstract": n.get("abstract") or "",
+            "source": []
+        }
     return None
@@ -0,0 +1,112 @@
+# services/ranking_service.py
+# -*- coding: utf-8 -*-
+"""
+排行榜：rank_table_*.json 的技术 / 产品按 key_score 降序。
+每个数据快照上预先按 (类型, 领域, 年份) 分桶排好序，请求只做切片，不再逐条过滤、排序。
+也可按图结构指标（graph_metrics：pagerank / degree / betweenness）排序，各自一套分桶，首次用到时构建。
+"""
+from __future__ import annotations
+import heapq
+from itertools import islice
+from typing import Dict, Any, List, Optional, Tuple
+
+from services import data_store
+from services.graph_metrics import METRICS, get_metrics
+
+TYPES = ("tech", "product")
+SORTS = ("score",) + METRICS
+
+# 桶 key：(type, field, year)，field / year 为 None 表示“全部”
+_BucketKey = Tuple[str, Optional[str], Optional[str]]
+
+
+def norm_type(t) -> str:
+    t = (t or "").strip().lower()
+    if t in ("技术", "tech", "technology"): return "tech"
+    if t in ("产品", "product"): return "product"
+    return ""
+
+
+def score_of(rec: Dict[str, Any]) -> float:
+    # 主用 key_score；没有就用三项均值兜底
+    ks = rec.get("key_score")
+    if isinstance(ks, (int, float)):
+        return float(ks)
+    parts = [rec.get("article_score"), rec.get("patent_score"), rec.get("report_score")]
+    parts = [float(x) for x in parts if isinstance(x, (int, float))]
+    return sum(parts) / len(parts) if parts else 0.0
+
+
+def _build(store: data_store.DataStore) -> Dict[_BucketKey, List[Dict[str, Any]]]:
+    rows: Dict[str, List[Dict[str, Any]]] = {t: [] for t in TYPES}
+    metrics = get_metrics(store)
+    for rec in store.rank_by_id.values():
+        t = norm_type(rec.get("type"))
+        if not t or not rec.get("name"):
+            continue
+        rows[t].append({
+            "id": rec.get("id"),
+            "name": rec.get("name"),
+            "field": rec.get("field"),
+            "year": rec.get("year"),
+            "key_score": score_of(rec),
+            **metrics.of(rec.get("id")),
+        })
+
+    buckets: Dict[_BucketKey, List[Dict[str, Any]]] = {}
+    for t, lst in rows.items():
+        # 只排一次；子桶按已排好的顺序依次追加，天然有序（同分保持文件顺序）
+        lst.sort(key=lambda r: r["key_score"], reverse=True)
+        buckets[(t, None, None)] = lst
+        for r in lst:
+            field = (r["field"] or "").strip()
+            year = str(r["year"] if r["year"] is not None else "").strip()
+            buckets.setdefault((t, field, None), []).append(r)
+            buckets.setdefault((t, None, year), []).append(r)
+            buckets.setdefault((t, field, year), []).append(r)
+    return buckets
+
+
+def _buckets(store: Optional[data_store.DataStore] = None, sort: str = "score") -> Dict[_BucketKey, List[Dict[str, Any]]]:
+    store = store or data_store.get_store()
+    if sort not in METRICS:
+        return store.memo("ranking.buckets", _build)
+    # 在 key_score 分桶上按指标稳定重排：同指标值时仍按 key_score 降序
+    return store.memo("ranking.buckets." + sort, lambda st: {
+        k: sorted(lst, key=lambda r: r[sort], reverse=True) for k, lst in _buckets(st).items()})
+
+
+def _sort_field(sort: str) -> str:
+    return sort if sort in METRICS else "key_score"
+
+
+def _key(type_: str, field: str, year: str) -> _BucketKey:
+    field = (field or "").strip()
+    year = (year or "").strip()
+    return type_, (None if not field or field == "全部" else field), (year or None)
+
+
+def count(type_: str, field: str = "", year: str = "") -> int:
+    return len(_buckets().get(_key(type_, field, year), ()))
+
+
+def top(type_: str, field: str = "", year: str = "", limit: Optional[int] = None,
+        offset: int = 0, sort: str = "score") -> List[Dict[str, Any]]:
+    """
+    type_: tech / product；其他值（含空）表示技术 + 产品合并排名（两路有序归并）。
+    field 为空或“全部”不过滤领域；year 为空不过滤年份。
+    sort: score（key_score）/ pagerank / degree / betweenness。返回的行是共享对象，不要原地修改。
+    """
+    stop = None if limit is None else offset + limit
+    bk = _buckets(sort=sort)
+    if type_ in TYPES:
+        return bk.get(_key(type_, field, year), [])[offset:stop]
+    col = _sort_field(sort)
+    merged = heapq.merge(*(bk.get(_key(t, field, year), []) for t in TYPES),
+                         key=lambda r: r[col], reverse=True)
+    return list(islice(merged, offset, stop))
+
+
+@data_store.register_warmer
+def _warm(store: data_store.DataStore, changed):
+    _buckets(store)
@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import List, Dict
-import re, unicodedata
+from typing import List, Dict, Set, Tuple, Optional, Any
+import heapq, re, unicodedata
 
 def norm(text: str) -> str:
     if not text:
         return ""
     return unicodedata.normalize("NFKC", str(text)).lower().strip()
 
+_NO_GRAPH = {"degree": 0, "pagerank": 0.0, "betweenness": 0.0}
+
 _TAG_RE = re.compile(r"<[^>]+>")
 
 def _strip_tags(s: str) -> str:
@@ -19,22 +21,217 @@ def _kind_ok(it: Dict, type_: str) -> bool:
         return k == "关键产品"
     return k == "关键技术"
 
+def _kind_of(type_: str) -> str:
+    return "关键产品" if (type_ or "tech") == "product" else "关键技术"
+
+def _haystack(it: Dict) -> str:
+    # 卡片 id 是 48 bit 哈希（15 位十进制），放进来会让数字查询随机命中，不参与检索
+    aliases = it.get("_aliases") or []
+    hay_parts = [
+        it.get("name",""),
+        _strip_tags(it.get("org","")),
+        it.get("abstract",""),
+        " ".join(aliases),
+        str(it.get("_node_id") or ""),
+    ]
+    return norm(" ".join(hay_parts))
+
 def search_items(items: List[Dict], q: str, type_: str) -> List[Dict]:
+    """线性扫描版本：适用于任意临时列表；全量卡片请用 SearchIndex。"""
     base = [it for it in items if _kind_ok(it, type_)]
     qn = norm(q)
     if not qn:
         return base
-    res = []
-    for it in base:
-        aliases = it.get("_aliases") or []
-        hay_parts = [
-            it.get("name",""),
-            _strip_tags(it.get("org","")),
-            it.get("abstract",""),
-            " ".join(aliases),
-            str(it.get("_node_id") or ""),
-            str(it.get("id") or ""),
-        ]
-        if qn in norm(" ".join(hay_parts)):
-            res.append(it)
-    return res
+    return [it for it in base if qn in _haystack(it)]
+
+
+# ---------------- 倒排 n-gram 索引 ----------------
+# 中英混排文本没有可靠的分词边界，所以直接按字符切 1/2/3-gram：
+# 查询串的所有 n-gram 都必须出现在命中卡片的 haystack 里，
+# 因此先求 posting 交集得到候选，再用原始子串判断校验，结果与 search_items 完全一致。
+_GRAM_SIZES = (1, 2, 3)
+
+
+def _grams(s: str, n: int) -> Set[str]:
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+class _Partition:
+    """同一 kind（关键技术 / 关键产品）下的卡片与 posting。"""
+
+    __slots__ = ("items", "hays", "fields", "postings", "graph")
+
+    def __init__(self):
+        self.items: List[Dict] = []
+        self.hays: List[str] = []
+        # 预归一化字段：(name, aliases, abstract)，供相关度打分复用
+        self.fields: List[Tuple[str, Tuple[str, ...], str]] = []
+        self.postings: Dict[str, Set[int]] = {}
+        # 图结构指标 {degree, pagerank, betweenness}，供按中心性排序
+        self.graph: List[Dict[str, float]] = []
+
+    def add(self, it: Dict, graph: Optional[Dict[str, float]] = None):
+        pos = len(self.items)
+        hay = _haystack(it)
+        self.items.append(it)
+        self.graph.append(graph or _NO_GRAPH)
+        self.hays.append(hay)
+        self.fields.append((
+            norm(it.get("name", "")),
+            tuple(norm(a) for a in (it.get("_aliases") or [])),
+            norm(it.get("abstract", "")),
+        ))
+        for n in _GRAM_SIZES:
+            for g in _grams(hay, n):
+                self.postings.setdefault(g, set()).add(pos)
+
+    def match(self, qn: str) -> List[int]:
+        """返回命中卡片在分区内的下标（保持原列表顺序）。"""
+        if not qn:
+            return list(range(len(self.items)))
+        n = min(len(qn), _GRAM_SIZES[-1])
+        lists = []
+        for g in _grams(qn, n):
+            p = self.postings.get(g)
+            if not p:
+                return []
+            lists.append(p)
+        lists.sort(key=len)
+        cand = set(lists[0])
+        for p in lists[1:]:
+            cand &= p
+            if not cand:
+                return []
+        hays = self.hays
+        return [i for i in sorted(cand) if qn in hays[i]]
+
+
+class SearchIndex:
+    """
+    卡片检索索引：构建一次，按 kind 分区。
+    search() 的结果集合与顺序与 search_items(items, q, type_) 相同。
+    """
+
+    def __init__(self, items: List[Dict], metrics: Optional[Any] = None):
+        """metrics：graph_metrics.GraphMetrics（按 _node_id 查结构指标），为空时指标都按 0 处理"""
+        self.partitions: Dict[str, _Partition] = {
+            "关键技术": _Partition(),
+            "关键产品": _Partition(),
+        }
+        for it in items:
+            part = self.partitions.get(it.get("kind"))
+            if part is not None:
+                part.add(it, metrics.of(it.get("_node_id")) if metrics is not None else None)
+
+    def partition(self, type_: str) -> _Partition:
+        return self.partitions[_kind_of(type_)]
+
+    def search(self, q: str, type_: str) -> List[Dict]:
+        part = self.partition(type_)
+        return [part.items[i] for i in part.match(norm(q))]
+
+    def query(self, q: str, type_: str = "", field: str = "", country: str = "",
+              sort: str = "rel", offset: int = 0, limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        相关度检索 + 分面过滤 + 分页。
+        - type_ 为空时同时检索技术与产品
+        - sort: rel（命中位置 × 关键度）/ score（关键度）/ year（年份）/
+          pagerank / degree / betweenness（图结构指标，见 graph_metrics）
+        - 只用堆取前 offset+limit 条，不对全部命中排序
+        返回 (当前页, 命中总数)
+        """
+        qn = norm(q)
+        field = (field or "").strip()
+        country = (country or "").strip()
+        if sort not in _SORT_KEYS:
+            sort = "rel"
+        kinds = [_kind_of(type_)] if type_ in ("tech", "product") else ["关键技术", "关键产品"]
+
+        cands = []
+        for kind in kinds:
+            part = self.partitions[kind]
+            for i in part.match(qn):
+                it = part.items[i]
+                if field and _meta_of(it).get("field") != field:
+                    continue
+                if country and not _country_ok(it, country):
+                    continue
+                cands.append((part, i))
+
+        total = len(cands)
+        k = max(0, offset) + max(0, limit)
+        key_fn = _SORT_KEYS[sort]
+        # 同分时按原列表顺序（kind 序 + 分区下标）稳定输出
+        top = heapq.nlargest(k, enumerate(cands), key=lambda c: (key_fn(c[1][0], c[1][1], qn), -c[0]))
+        page = []
+        for _, (part, i) in top[max(0, offset):]:
+            it = part.items[i]
+            meta = _meta_of(it)
+            page.append({
+                "id": it["id"],
+                "name": it.get("name"),
+                "kind": it.get("kind"),
+                "field": meta.get("field") or "—",
+                "country": meta.get("country") or "—",
+                "year": meta.get("year") or "—",
+                "abstract": it.get("abstract") or "",
+                "key_score": _key_score(it),
+                "score": round(_relevance(part, i, qn), 6),
+                **part.graph[i],
+            })
+        return page, total
+
+
+# ---------------- 相关度 ----------------
+_W_NAME, _W_ALIAS, _W_ABSTRACT, _W_OTHER = 3.0, 2.0, 1.0, 0.5
+
+
+def _meta_of(it: Dict) -> Dict:
+    return it.get("_meta") or {}
+
+
+def _key_score(it: Dict) -> Optional[float]:
+    ks = (it.get("_scores") or {}).get("key")
+    return float(ks) if isinstance(ks, (int, float)) else None
+
+
+def _country_ok(it: Dict, country: str) -> bool:
+    return _meta_of(it).get("country") == country or country in (it.get("_countries") or [])
+
+
+def _relevance(part: _Partition, i: int, qn: str) -> float:
+    """name 命中 > alias 命中 > abstract 命中 > 其他字段命中，再乘 (1 + key_score)。"""
+    name, aliases, abstract = part.fields[i]
+    if not qn:
+        w = _W_OTHER
+    elif qn in name:
+        w = _W_NAME + (1.0 if qn == name else 0.0)
+    elif any(qn in a for a in aliases):
+        w = _W_ALIAS
+    elif qn in abstract:
+        w = _W_ABSTRACT
+    else:
+        w = _W_OTHER
+    return w * (1.0 + (_key_score(part.items[i]) or 0.0))
+
+
+def _year_of(it: Dict) -> int:
+    y = _meta_of(it).get("year")
+    try:
+        return int(y)
+    except (TypeError, ValueError):
+        return 0
+
+
+_SORT_KEYS = {
+    "rel": lambda part, i, qn: (_relevance(part, i, qn), _key_score(part.items[i]) or 0.0),
+    "score": lambda part, i, qn: (_key_score(part.items[i]) or 0.0, _relevance(part, i, qn)),
+    "year": lambda part, i, qn: (_year_of(part.items[i]), _key_score(part.items[i]) or 0.0),
+    "pagerank": lambda part, i, qn: (part.graph[i]["pagerank"], _relevance(part, i, qn)),
+    "degree": lambda part, i, qn: (part.graph[i]["degree"], _relevance(part, i, qn)),
+    "betweenness": lambda part, i, qn: (part.graph[i]["betweenness"], _relevance(part, i, qn)),
+}
+
+
+def build_search_index(items: List[Dict], metrics: Optional[Any] = None) -> SearchIndex:
+    return SearchIndex(items, metrics)
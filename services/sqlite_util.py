@@ -0,0 +1,53 @@
+# services/sqlite_util.py
+# -*- coding: utf-8 -*-
+"""本地 SQLite 小工具：抽取缓存、识别任务等多个 gunicorn worker 共用的状态文件。"""
+from __future__ import annotations
+import os
+
+from sqlalchemy import MetaData, create_engine, event, inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import Engine
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+def default_db_path(env_name: str, file_name: str) -> str:
+    """env_name 指定的路径；未配置时放在 DB_PATH 同目录（容器内为 /data 卷），再退回到项目 data/ 目录"""
+    if os.getenv(env_name):
+        return os.getenv(env_name)
+    db = os.getenv("DB_PATH")
+    base = os.path.dirname(db) if db else os.path.join(ROOT_DIR, "data")
+    return os.path.join(base, file_name)
+
+
+def open_engine(path: str, metadata: MetaData) -> Engine:
+    """打开（必要时创建）SQLite 文件并建表；WAL 模式，允许多进程并发读写。"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 10})
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(conn, _):
+        cur = conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.close()
+
+    metadata.create_all(engine)
+    _add_missing_columns(engine, metadata)
+    return engine
+
+
+def _add_missing_columns(engine: Engine, metadata: MetaData):
+    """旧版本建的表缺少后来新增的可空列时补上（SQLite 只支持 ADD COLUMN）。"""
+    insp = inspect(engine)
+    for table in metadata.sorted_tables:
+        have = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in have or not col.nullable:
+                continue
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {col.name} "
+                                         f"{col.type.compile(engine.dialect)}")
+            except OperationalError:
+                pass  # 其他 worker 已经加上了
@@ -0,0 +1,106 @@
+# services/term_matcher.py
+# -*- coding: utf-8 -*-
+"""
+标准词库模糊匹配：对模型抽取出的词，在词库里找 fuzz.partial_ratio 最高（同分取靠前）的词，
+分数 >= 阈值（默认 70）则替换为标准词。结果与逐对比较的嵌套循环完全一致，但：
+- 词库 key 预先小写，只做一次
+- 按字符倒排做候选预筛（见 _candidates），大部分 key 不会进入 RapidFuzz 计算
+- 候选交给 RapidFuzz 的 process.extractOne / process.cdist（cdist 可多线程）
+"""
+from __future__ import annotations
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+DEFAULT_THRESHOLD = 70
+# 一次匹配的词数达到该值、且各词候选大多重合时改用 cdist 批量计算
+_BATCH_MIN = 8
+_BATCH_OVERLAP = 2
+# cdist 线程数：-1 为全部核
+WORKERS = int(os.getenv("FUZZY_WORKERS", "-1") or -1)
+
+
+class TermMatcher:
+    """
+    预构建的词库匹配器（词库不变时可复用）。
+
+    预筛的依据：partial_ratio 是较短串 s 与较长串某个窗口 w 的 Indel 相似度
+    2·LCS/(|s|+|w|)，窗口长度不超过 |s|。分数 >= 70 推出 LCS >= 0.538·|s|，
+    而 LCS 不会超过两串的公共字符数（按多重集计）。所以公共字符数 < 0.5·min(长度) 的 key
+    不可能达到阈值，可以直接跳过，不影响结果。
+    """
+
+    def __init__(self, keys: Iterable[str], threshold: float = DEFAULT_THRESHOLD,
+                 workers: int = WORKERS):
+        self.keys: List[str] = [k for k in keys]
+        self.lowered: List[str] = [str(k).lower() for k in self.keys]
+        self.threshold = threshold
+        self.workers = workers
+        self._key_len = np.fromiter((len(k) for k in self.lowered), dtype=np.int32, count=len(self.lowered))
+
+        # 字符倒排：char -> (key 下标数组, 该字符在 key 中出现次数)
+        acc: Dict[str, Tuple[List[int], List[int]]] = {}
+        for i, k in enumerate(self.lowered):
+            for ch, cnt in Counter(k).items():
+                lst = acc.setdefault(ch, ([], []))
+                lst[0].append(i)
+                lst[1].append(cnt)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            ch: (np.asarray(ix, dtype=np.int32), np.asarray(cn, dtype=np.int32)) for ch, (ix, cn) in acc.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _candidates(self, word_low: str) -> np.ndarray:
+        """可能达到阈值的 key 下标（升序，保证同分时仍取词库中靠前的 key）。"""
+        if not word_low or not len(self.keys):
+            return np.empty(0, dtype=np.int64)
+        common = np.zeros(len(self.keys), dtype=np.int32)
+        for ch, cnt in Counter(word_low).items():
+            p = self._postings.get(ch)
+            if p is not None:
+                common[p[0]] += np.minimum(p[1], cnt)
+        need = 0.5 * np.minimum(self._key_len, len(word_low))
+        return np.flatnonzero((common > 0) & (common >= need))
+
+    def match_one(self, word: str) -> Optional[str]:
+        """返回匹配到的标准词；低于阈值返回 None。"""
+        word_low = str(word).lower()
+        return self._best(word_low, self._candidates(word_low))
+
+    def _best(self, word_low: str, cand: np.ndarray) -> Optional[str]:
+        if not len(cand):
+            return None
+        res = process.extractOne(word_low, [self.lowered[i] for i in cand],
+                                 scorer=fuzz.partial_ratio, score_cutoff=self.threshold)
+        return self.keys[cand[res[2]]] if res else None
+
+    def match(self, words: Sequence[str]) -> List[Optional[str]]:
+        """逐词返回匹配到的标准词或 None；词多且候选大多重合时合并后用 cdist 一次算完。"""
+        if len(words) < _BATCH_MIN:
+            return [self.match_one(w) for w in words]
+        lows = [str(w).lower() for w in words]
+        cands = [self._candidates(w) for w in lows]
+        union = np.unique(np.concatenate(cands))
+        if not len(union):
+            return [None] * len(words)
+        # cdist 会计算 词数 × 候选并集 的全部组合；各词候选重合度不高时，多算的组合比多线程省下的还多
+        if len(union) * len(lows) > _BATCH_OVERLAP * sum(len(c) for c in cands):
+            return [self._best(w, c) for w, c in zip(lows, cands)]
+        # 非候选的 (词, key) 分数必然低于阈值，被 score_cutoff 置 0，不影响 argmax
+        scores = process.cdist(lows, [self.lowered[i] for i in union], scorer=fuzz.partial_ratio,
+                               score_cutoff=self.threshold, dtype=np.float64, workers=self.workers)
+        best = np.argmax(scores, axis=1)
+        out: List[Optional[str]] = []
+        for r, j in enumerate(best):
+            out.append(self.keys[union[j]] if scores[r, j] >= self.threshold and scores[r, j] > 0 else None)
+        return out
+
+    def normalize(self, words: Sequence[str]) -> List[str]:
+        """匹配到的替换为标准词，否则保留原词；保序去重。"""
+        hits = self.match(list(words))
+        return list(dict.fromkeys(h if h else w for w, h in zip(words, hits)))
@@ -0,0 +1,100 @@
+# services/text_chunker.py
+# -*- coding: utf-8 -*-
+"""
+长文本切块：供大模型分块抽取使用。
+
+优先按段落切，段落过长再按句子（。！？；及英文句点）切，单句仍过长才硬切；
+相邻两块之间保留不超过 overlap 字符的整句重叠，避免跨块的词被截断漏抽。
+长度按字符计（中文约 1 字 ≈ 1 token，英文偏保守）。
+"""
+from __future__ import annotations
+import os, re
+from typing import Iterable, Iterator, List, Tuple
+
+MAX_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "4000"))
+OVERLAP = int(os.getenv("LLM_CHUNK_OVERLAP", "200"))
+
+_PARA_RE = re.compile(r"\n\s*\n|\r\n\s*\r\n")
+_SENT_RE = re.compile(r".+?(?:[。！？!?；;…]+|\.(?=\s)|\n|$)", re.S)
+
+# (文本, 是否段首)
+_Unit = Tuple[str, bool]
+
+
+def _units(text: str, max_chars: int) -> List[_Unit]:
+    out: List[_Unit] = []
+    for para in _PARA_RE.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        if len(para) <= max_chars:
+            out.append((para, True))
+            continue
+        first = True
+        for sent in _SENT_RE.findall(para):
+            if not sent.strip():
+                continue
+            for i in range(0, len(sent), max_chars):
+                out.append((sent[i:i + max_chars], first))
+                first = False
+    return out
+
+
+def _join(units: List[_Unit]) -> str:
+    parts = []
+    for i, (s, para_start) in enumerate(units):
+        parts.append(("\n" if i and para_start else "") + s)
+    return "".join(parts).strip()
+
+
+def split_text(text: str, max_chars: int = MAX_CHARS, overlap: int = OVERLAP) -> List[str]:
+    """切成每块不超过 max_chars 字符的若干块；不超过上限的文本原样作为一块返回。"""
+    text = text or ""
+    if len(text.strip()) <= max_chars:
+        return [text] if text.strip() else []
+
+    chunks: List[str] = []
+    cur: List[_Unit] = []
+    cur_len = 0
+    for u in _units(text, max_chars):
+        if cur and cur_len + len(u[0]) + 1 > max_chars:
+            chunks.append(_join(cur))
+            # 从上一块末尾带上若干整句作为重叠
+            carry: List[_Unit] = []
+            n = 0
+            for prev in reversed(cur):
+                if n + len(prev[0]) > overlap:
+                    break
+                carry.insert(0, prev)
+                n += len(prev[0]) + 1
+            if n + len(u[0]) > max_chars:
+                carry, n = [], 0
+            cur, cur_len = carry, n
+        cur.append(u)
+        cur_len += len(u[0]) + 1
+    if cur:
+        chunks.append(_join(cur))
+    return chunks
+
+
+def iter_chunks(pieces: Iterable[str], max_chars: int = MAX_CHARS, overlap: int = OVERLAP) -> Iterator[str]:
+    """
+    流式切块：pieces 逐段到达（如 PDF 逐页文本），攒够两块以上就先产出前面的块，
+    下游不必等全文解析完。总长不超过 max_chars 时与 split_text 一样原样作为一块。
+    """
+    buf: List[str] = []
+    n = 0
+    for piece in pieces:
+        buf.append(piece)
+        n += len(piece)
+        if n > 2 * max_chars:
+            parts = split_text("".join(buf), max_chars, overlap)
+            if not parts:
+                buf, n = [], 0
+                continue
+            yield from parts[:-1]
+            # 最后一块（已带上与前一块的重叠）留作下一轮的开头
+            buf, n = [parts[-1]], len(parts[-1])
+    text = "".join(buf)
+    if text.strip():
+        yield from split_text(text, max_chars, overlap)
@@ -0,0 +1,313 @@
+# services/upload_store.py
+# -*- coding: utf-8 -*-
+"""
+上传文件按内容寻址存储：<UPLOAD_DIR>/<sha256 前两位>/<sha256>.<pdf|docx|txt>
+
+- 同一文件重复上传只存一份，不同文件同名也不会互相覆盖
+- 抽取出的纯文本 gzip 压缩后存在同目录 <sha256>.txt.gz，再次识别时跳过文件解析
+  （分块一致，配合抽取缓存，重复文件整条流水线都命中缓存）
+- 上传时由 HashingFile 直接按块写入上传目录的临时文件，边写边算 sha256、记录文件头，
+  完成后改名即可，内存占用与文件大小无关；类型按文件头（magic bytes）判定而不是文件名
+- 总大小超过 UPLOAD_MAX_BYTES 或文件数超过 UPLOAD_MAX_FILES 时，按最近使用时间（mtime，复用时会刷新）
+  从旧到新清理；UPLOAD_MIN_AGE 秒内用过的不删，避免排队中的任务文件被清掉。
+  上传时只比较进程内累计的总量，超限或距上次全量扫描超过 UPLOAD_CLEAN_INTERVAL 秒
+  （其他 worker 写入的文件靠这次重新扫描计入）才遍历目录
+"""
+from __future__ import annotations
+import gzip, hashlib, os, re, tempfile, threading, time, zipfile
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR") or os.path.join(ROOT_DIR, "static", "uploads")
+MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(1024 * 1024 * 1024)))
+MAX_FILES = int(os.getenv("UPLOAD_MAX_FILES", "2000"))
+MIN_AGE = float(os.getenv("UPLOAD_MIN_AGE", "600"))
+CLEAN_INTERVAL = float(os.getenv("UPLOAD_CLEAN_INTERVAL", "300"))
+# 超限时清理到上限的这个比例，之后若干次上传都不会再触发扫描
+LOW_WATER = 0.9
+# 单次请求体上限（Flask MAX_CONTENT_LENGTH），超过直接 413
+MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(50 * 1024 * 1024)))
+
+COPY_CHUNK = 1024 * 1024
+HEAD_BYTES = 8192
+TEXT_SUFFIX = ".txt.gz"
+
+_NAME_RE = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,8})?$")
+_CLEAN_LOCK = threading.Lock()
+
+
+class UnsupportedUpload(ValueError):
+    """无法识别的文件类型"""
+
+
+def sniff_type(head: bytes, path: Optional[str] = None) -> Optional[str]:
+    """按文件头判断类型：pdf / docx / txt；无法识别返回 None（docx 需要 path 检查 zip 目录）"""
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        if path is None:
+            return None
+        try:
+            with zipfile.ZipFile(path) as z:
+                return "docx" if "word/document.xml" in z.namelist() else None
+        except zipfile.BadZipFile:
+            return None
+    if b"\x00" in head:
+        return None
+    # 文件头可能截断在多字节字符中间
+    for cut in range(4):
+        try:
+            head[:len(head) - cut].decode("utf-8")
+            return "txt"
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def sniff_file(path: str) -> Optional[str]:
+    with open(path, "rb") as f:
+        head = f.read(HEAD_BYTES)
+    return sniff_type(head, path)
+
+
+def _path_for(digest: str, suffix: str, base: str = UPLOAD_DIR) -> str:
+    return os.path.join(base, digest[:2], digest + suffix)
+
+
+def _touch(path: str):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+class HashingFile:
+    """
+    上传流的落盘文件（作为 Werkzeug 的 file stream）：写入时计算 sha256 并保留文件头，
+    由 save_upload 改名为内容寻址路径；未被保存的在请求结束 close 时删除。
+    """
+
+    def __init__(self, base: str = UPLOAD_DIR):
+        os.makedirs(base, exist_ok=True)
+        self.base = base
+        fd, self.tmp_path = tempfile.mkstemp(dir=base, prefix=".upload-")
+        self._f = os.fdopen(fd, "w+b")
+        self._hash = hashlib.sha256()
+        self.head = b""
+        self.size = 0
+        self.kept = False
+
+    def write(self, data) -> int:
+        if len(self.head) < HEAD_BYTES:
+            self.head += bytes(data[:HEAD_BYTES - len(self.head)])
+        self._hash.update(data)
+        self.size += len(data)
+        return self._f.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def close(self):
+        self._f.close()
+        if not self.kept and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __getattr__(self, name):
+        # read / readline / seek / tell / flush 等直接交给底层文件
+        return getattr(self._f, name)
+
+
+def _store(tmp: str, digest: str, kind: str, base: str) -> str:
+    path = _path_for(digest, "." + kind, base)
+    if os.path.exists(path):
+        os.remove(tmp)
+        _touch(path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+        _account(base, os.path.getsize(path), 1)
+    return path
+
+
+def save_upload(stream: BinaryIO, base: str = UPLOAD_DIR) -> Tuple[str, str]:
+    """
+    保存上传文件，返回 (存储路径, sha256)；内容已存在时不重复写入，无法识别的类型抛 UnsupportedUpload。
+    stream 为 HashingFile 时只需改名；其他流按块复制并计算 sha256。
+    """
+    if isinstance(stream, HashingFile) and os.path.dirname(stream.tmp_path) == os.path.abspath(base):
+        stream.flush()
+        kind = sniff_type(stream.head, stream.tmp_path)
+        if kind is None:
+            raise UnsupportedUpload("unsupported file type")
+        stream.kept = True
+        path = _store(stream.tmp_path, stream.hexdigest(), kind, base)
+        _maybe_cleanup(base)
+        return path, stream.hexdigest()
+
+    os.makedirs(base, exist_ok=True)
+    h = hashlib.sha256()
+    head = b""
+    fd, tmp = tempfile.mkstemp(dir=base, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for buf in iter(lambda: stream.read(COPY_CHUNK), b""):
+                if len(head) < HEAD_BYTES:
+                    head += buf[:HEAD_BYTES - len(head)]
+                h.update(buf)
+                out.write(buf)
+        kind = sniff_type(head, tmp)
+        if kind is None:
+            raise UnsupportedUpload("unsupported file type")
+        path = _store(tmp, h.hexdigest(), kind, base)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _maybe_cleanup(base)
+    return path, h.hexdigest()
+
+
+def digest_of(path: str) -> str:
+    """存储路径直接取文件名里的 sha256，其他文件现算"""
+    m = _NAME_RE.match(os.path.basename(path))
+    if m:
+        return m.group(1)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(COPY_CHUNK), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+# ---------------- 抽取文本缓存 ----------------
+# 按段（如 PDF 的页）存放：回放时分段与首次解析一致，流式切出的块相同，才能命中抽取缓存
+_PIECE_SEP = "\x1e"
+
+
+def load_pieces(digest: str, base: str = UPLOAD_DIR) -> Optional[List[str]]:
+    path = _path_for(digest, TEXT_SUFFIX, base)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            text = f.read()
+    except (OSError, EOFError, UnicodeDecodeError):
+        return None
+    _touch(path)
+    return text.split(_PIECE_SEP)
+
+
+class PieceWriter:
+    """边抽取边压缩写入文本缓存；commit() 后才生效，中途放弃（未 commit）不留下半截缓存"""
+
+    def __init__(self, digest: str, base: str = UPLOAD_DIR):
+        self.base = base
+        self.path = _path_for(digest, TEXT_SUFFIX, base)
+        self._gz = None
+        self._first = True
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, self._tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".text-")
+            self._raw = os.fdopen(fd, "wb")
+            self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        except OSError as e:
+            print("⚠️ 抽取文本缓存写入失败:", e)
+
+    def write(self, piece: str):
+        if self._gz is None:
+            return
+        if not self._first:
+            self._gz.write(_PIECE_SEP.encode("utf-8"))
+        self._first = False
+        self._gz.write(piece.replace(_PIECE_SEP, " ").encode("utf-8"))
+
+    def commit(self):
+        if self._gz is None:
+            return
+        try:
+            self._gz.close()
+            self._raw.close()
+            old = os.path.getsize(self.path) if os.path.exists(self.path) else None
+            os.replace(self._tmp, self.path)
+            _account(self.base, os.path.getsize(self.path) - (old or 0), 0 if old is not None else 1)
+        except OSError as e:
+            print("⚠️ 抽取文本缓存写入失败:", e)
+        self._gz = None
+
+    def discard(self):
+        if self._gz is None:
+            return
+        self._gz.close()
+        self._raw.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+        self._gz = None
+
+
+# ---------------- 清理 ----------------
+class _Usage:
+    """某个上传目录的累计占用：上次全量扫描的结果 + 之后本进程写入的文件"""
+    __slots__ = ("bytes", "files", "scanned_at", "over")
+
+    def __init__(self, total: int, files: int, scanned_at: float, over: bool):
+        self.bytes, self.files, self.scanned_at, self.over = total, files, scanned_at, over
+
+
+_USAGE: Dict[str, _Usage] = {}
+
+
+def _account(base: str, size: int, files: int):
+    with _CLEAN_LOCK:
+        u = _USAGE.get(os.path.abspath(base))
+        if u is not None:
+            u.bytes += size
+            u.files += files
+
+
+def _maybe_cleanup(base: str = UPLOAD_DIR, max_bytes: int = MAX_BYTES, max_files: int = MAX_FILES,
+                   min_age: float = MIN_AGE) -> int:
+    """
+    上传后调用：累计值未超限时不扫描目录。超限时扫描清理；
+    清理后仍超限（剩下的都在 min_age 内）时等 CLEAN_INTERVAL 过后再扫，不在每次上传时重复遍历。
+    """
+    u = _USAGE.get(os.path.abspath(base))
+    if u is not None and time.time() - u.scanned_at < CLEAN_INTERVAL:
+        if u.over or (u.bytes <= max_bytes and u.files <= max_files):
+            return 0
+    return cleanup(base, max_bytes, max_files, min_age)
+
+
+def cleanup(base: str = UPLOAD_DIR, max_bytes: int = MAX_BYTES, max_files: int = MAX_FILES,
+            min_age: float = MIN_AGE) -> int:
+    """超出容量时按最近使用时间从旧到新删除到上限的 LOW_WATER（原文件与其文本缓存各算一项），返回删除数"""
+    with _CLEAN_LOCK:
+        entries: List[Tuple[float, int, str]] = []
+        total = 0
+        for root, _, files in os.walk(base):
+            for name in files:
+                if not (_NAME_RE.match(name) or name.endswith(TEXT_SUFFIX)):
+                    continue
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        count = len(entries)
+        removed = 0
+        now = time.time()
+        if total > max_bytes or count > max_files:
+            low_bytes, low_files = int(max_bytes * LOW_WATER), int(max_files * LOW_WATER)
+            for mtime, size, p in sorted(entries):
+                if total <= low_bytes and count <= low_files:
+                    break
+                if now - mtime < min_age:
+                    break
+                try:
+                    os.remove(p)
+                except OSError:
+                    continue
+                total -= size
+                count -= 1
+                removed += 1
+        _USAGE[os.path.abspath(base)] = _Usage(total, count, now, total > max_bytes or count > max_files)
+        return removed
@@ -12,9 +12,10 @@ async function loadResults(q, kind) {
     const sort = document.getElementById('sort').value || 'rel';
     const url = `/api/search?q=${encodeURIComponent(q)}&kind=${kind || ''}&field=${encodeURIComponent(field)}&country=${encodeURIComponent(country)}&sort=${sort}`;
     const res = await fetch(url);
-    const items = await res.json();
+    const data = await res.json();
+    const items = (data && data.items) || [];
     const ul = document.getElementById('list');
-    ul.innerHTML = (items || []).map(it => `
+    ul.innerHTML = items.map(it => `
     <li class="card">
       <div class="title"><a href="/detail/${it.id}">${it.name}</a></div>
       <div class="meta">${it.kind} | ${it.field} | ${it.country} | ${it.year}</div>
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
-from flask import Blueprint, render_template, request, jsonify
-from services.graph_repo import get_items, get_detail, build_graph_for_domain, list_domains
-from services.search_service import search_items
-from services.detail_repo import get_detail_by_node_id, load_all_details  # 新增导入
-from services.portrait_repo import load_graph_for_domain, load_node_detail
+from typing import Optional
+from flask import Blueprint, Response, render_template, request, jsonify
+from services import data_store
+from services.graph_repo import get_item, get_search_index, build_graph_for_domain_json, list_domains
+from services.detail_repo import get_detail_by_node_id  # 新增导入
+from services import ranking_service
+from services.json_codec import Encoded, encode
+from services.portrait_repo import load_graph_for_domain_json, load_node_detail
+from services import ego_graph
 
 base_bp = Blueprint("base", __name__)
 
@@ -28,7 +32,7 @@ def results_page():
         type_ = "tech"
 
     # ✅ 这里只在路由里调用搜索；不要在模块顶部调用！
-    found = search_items(get_items(), q, type_)
+    found = get_search_index().search(q, type_)
 
     # 仅传模板需要的字段
     view_items = [
@@ -50,8 +54,7 @@ def detail_page(item_id):
     服务端渲染详情页（若你的 detail.html 里自己 fetch /api/detail，就不一定用到这些上下文）
     """
     # 1) 先在聚合卡片里把 item 找出来（拿到 _node_id）
-    mp = {it["id"]: it for it in get_items()}
-    base_item = mp.get(item_id)
+    base_item = get_item(item_id)
     if not base_item:
         # 可渲染一个 404 模板；这里简单返回 detail.html 由前端再调用 /api/detail
         return _render("detail.html", active="results", item_id=item_id)
@@ -76,80 +79,24 @@ def detail_page(item_id):
 def portrait_page(item_id):
     return _render("portrait.html", active="portrait", item_id=item_id)
 
+RANKING_PAGE_LIMIT = 100
+
 @base_bp.route("/ranking")
 def ranking_page():
     """
-    读取 6 个 rank_table_*.json（detail_repo 已经聚合），
-    根据 query 参数过滤并按 key_score 排序，把“技术/产品”分别传给模板。
+    排行榜页：ranking_service 已按 (类型, 领域, 年份) 预排好序，这里只取前 RANKING_PAGE_LIMIT 条。
     """
     # 查询参数
     year_q  = request.args.get("year", "").strip()
     field_q = request.args.get("field", "").strip()  # 例如：'脑机接口'、'芯片'、'全部' 等
 
-    # 读取所有详细记录：{detail_id -> dict}
-    all_recs_map = load_all_details()
-    all_recs = list(all_recs_map.values())
-
-    # 过滤：仅保留有 name / key_score 的条目
-    def norm_type(t):
-        t = (t or "").strip().lower()
-        if t in ("技术", "tech", "technology"): return "tech"
-        if t in ("产品", "product"): return "product"
-        return ""
-
-    def ok_year(rec):
-        if not year_q:
-            return True
-        try:
-            return str(rec.get("year", "")).strip() == str(year_q)
-        except Exception:
-            return False
-
-    def ok_field(rec):
-        if not field_q or field_q == "全部":
-            return True
-        return (rec.get("field") or "").strip() == field_q
-
-    def score_of(rec):
-        # 主用 key_score；没有就用三项均值兜底
-        ks = rec.get("key_score")
-        if isinstance(ks, (int, float)):
-            return float(ks)
-        parts = [rec.get("article_score"), rec.get("patent_score"), rec.get("report_score")]
-        parts = [float(x) for x in parts if isinstance(x, (int, float))]
-        return sum(parts) / len(parts) if parts else 0.0
-
-    # 拆成 技术 / 产品 两组
-    tech_rows = []
-    prod_rows = []
-    for rec in all_recs:
-        t = norm_type(rec.get("type"))
-        if not t:
-            continue
-        if not rec.get("name"):
-            continue
-        if not ok_year(rec) or not ok_field(rec):
-            continue
-        s = score_of(rec)
-        row = {
-            "id": rec.get("id"),
-            "name": rec.get("name"),
-            "field": rec.get("field"),
-            "year": rec.get("year"),
-            "key_score": s,
-        }
-        (tech_rows if t == "tech" else prod_rows).append(row)
-
-    # 排序：key_score 降序
-    tech_rows.sort(key=lambda r: r["key_score"], reverse=True)
-    prod_rows.sort(key=lambda r: r["key_score"], reverse=True)
-
-    # 传入模板
     return _render(
         "ranking.html",
         active="ranking",
-        items_tech=tech_rows,   # 取前 100（可自行调整）
-        items_prod=prod_rows,
+        items_tech=ranking_service.top("tech", field_q, year_q, RANKING_PAGE_LIMIT),
+        items_prod=ranking_service.top("product", field_q, year_q, RANKING_PAGE_LIMIT),
+        total_tech=ranking_service.count("tech", field_q, year_q),
+        total_prod=ranking_service.count("product", field_q, year_q),
     )
 
 # ---------------- API ----------------
@@ -159,12 +106,18 @@ def api_detail(item_id):
     供前端 JS 使用的详情接口：
     - 优先用 rank_table_*.json 的详细数据
     - 找不到时，回退为卡片基础信息拼一个极简结构
+    编码后的响应体按卡片 id 缓存在当前数据快照上（先取缓存再取卡片：快照切换时最多把新数据放进旧快照的缓存）
     """
-    mp = {it["id"]: it for it in get_items()}
-    base_item = mp.get(item_id)
-    if not base_item:
-        return jsonify({"error": "not_found"}), 404
-
+    cache = data_store.get_store().memo("base_view.detail_json", lambda st: {})
+    enc = cache.get(item_id)
+    if enc is None:
+        base_item = get_item(item_id)
+        if not base_item:
+            return jsonify({"error": "not_found"}), 404
+        enc = cache[item_id] = encode(_detail_payload(item_id, base_item))
+    return _json_bytes(enc)
+
+def _detail_payload(item_id: int, base_item: dict) -> dict:
     node_id = base_item.get("_node_id", "")
     det = get_detail_by_node_id(node_id) or {}
 
@@ -191,7 +144,69 @@ def api_detail(item_id):
             "source_file": base_item.get("_source")
         }
     }
-    return jsonify(payload)
+    return payload
+
+def _json_bytes(enc: Encoded) -> Response:
+    """直接返回预编码的 JSON 字节；带 ETag，客户端缓存未变时回 304"""
+    resp = Response(enc.body, mimetype="application/json")
+    resp.set_etag(enc.etag)
+    return resp.make_conditional(request)
+
+def _int_arg(name: str, default: int, lo: int, hi: int) -> int:
+    try:
+        v = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        v = default
+    return max(lo, min(hi, v))
+
+def _year_arg(name: str) -> Optional[int]:
+    try:
+        return int(request.args.get(name, "").strip())
+    except ValueError:
+        return None
+
+@base_bp.route("/api/search")
+def api_search():
+    """
+    检索接口（static/js/main.js 使用）：
+    q / kind(tech|product|空=全部) / field / country / sort(rel|score|year|pagerank|degree|betweenness)
+    limit（默认 20，最多 100）/ cursor（上一页返回的 next_cursor）
+    """
+    limit = _int_arg("limit", 20, 1, 100)
+    offset = _int_arg("cursor", 0, 0, 10 ** 6)
+    kind = (request.args.get("kind", "") or "").strip().lower()
+    page, total = get_search_index().query(
+        request.args.get("q", "") or "",
+        type_=kind,
+        field=request.args.get("field", ""),
+        country=request.args.get("country", ""),
+        sort=(request.args.get("sort", "rel") or "rel").strip().lower(),
+        offset=offset,
+        limit=limit,
+    )
+    nxt = offset + len(page)
+    return jsonify({
+        "items": page,
+        "total": total,
+        "next_cursor": str(nxt) if nxt < total else None,
+    })
+
+@base_bp.route("/api/ranking")
+def api_ranking():
+    """
+    排行榜数据（static/js/ranking.js 使用）：
+    year / field / type(tech|product|空=合并) / limit（默认 100，最多 1000）/ offset
+    sort(score|pagerank|degree|betweenness，默认 score)
+    """
+    rows = ranking_service.top(
+        (request.args.get("type", "") or "").strip().lower(),
+        request.args.get("field", ""),
+        request.args.get("year", ""),
+        limit=_int_arg("limit", 100, 1, 1000),
+        offset=_int_arg("offset", 0, 0, 10 ** 6),
+        sort=(request.args.get("sort", "score") or "score").strip().lower(),
+    )
+    return jsonify(rows)
 
 # 1) 领域列表
 @base_bp.route("/api/domains", endpoint="domains_list")
@@ -205,7 +220,7 @@ def api_graph_by_domain():
     if not domain:
         domains = list_domains()
         domain = domains[0]["key"] if domains else ""
-    return jsonify(build_graph_for_domain(domain))
+    return _json_bytes(build_graph_for_domain_json(domain))
 
 # 3) 节点详情（按节点ID）
 @base_bp.route("/api/node/<path:node_id>", endpoint="node_detail_by_id")
@@ -227,9 +242,29 @@ def api_node_detail_by_id(node_id):
 def api_portrait_graph():
     domain = (request.args.get("domain","") or "").strip().lower()
     try:
-        data = load_graph_for_domain(domain)
+        enc = load_graph_for_domain_json(domain)
     except Exception as e:
         return jsonify({"error":"bad_domain","message":str(e)}), 400
+    return _json_bytes(enc)
+
+@base_bp.route("/api/portrait/<int:item_id>")
+def api_portrait_ego(item_id):
+    """
+    以卡片对应节点为中心的 k 跳子图（static/js/portrait.js、portrait.html 使用）：
+    depth（默认 2，最多 3）/ limit（节点预算，默认 80，最多 300）/ start_year / end_year
+    """
+    it = get_item(item_id)
+    if not it or not it.get("_node_id"):
+        return jsonify({"error": "not_found"}), 404
+    data = ego_graph.ego_graph(
+        it["_node_id"],
+        depth=_int_arg("depth", ego_graph.DEFAULT_DEPTH, 0, ego_graph.MAX_DEPTH),
+        max_nodes=_int_arg("limit", ego_graph.DEFAULT_NODES, 1, ego_graph.MAX_NODES),
+        start_year=_year_arg("start_year"),
+        end_year=_year_arg("end_year"),
+    )
+    if data is None:
+        return jsonify({"error": "not_found"}), 404
     return jsonify(data)
 
 @base_bp.route("/api/portrait_node_detail")
@@ -1,54 +1,159 @@
 # views/discover_view.py
-import os
-from flask import Blueprint, render_template, request, jsonify
-from services.intelligent_discovery import intelligent_discovery
+import json
+from flask import Blueprint, Request, Response, render_template, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from services import upload_store
+from services.identify_jobs import QueueFull, get_job_queue
+from services.intelligent_discovery import SOURCE_FILE, SOURCE_TEXT, intelligent_discovery, iter_discovery
 
 discover_bp = Blueprint("discover", __name__)
 
+
+class UploadRequest(Request):
+    """上传文件由 Werkzeug 边解析边写入上传目录（HashingFile），不经内存 / 系统临时目录中转"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return upload_store.HashingFile()
+
+
 # ---------- 页面路由 ----------
 @discover_bp.get("/identify")
 def identify_page():
     return render_template("identify.html", active="discover")
 
 
+# ---------- 请求解析 ----------
+def _read_request():
+    """
+    解析识别请求，返回 (文本或已保存的文件路径, 输入类型 text / file, None) 或 (None, None, 错误响应)
+    mode='text' 传 JSON {mode:'text', text:'...'}
+    mode='file' 上传 FormData {mode:'file', file:...}；类型按文件头判定（pdf / docx / txt）
+    请求体超过 MAX_CONTENT_LENGTH 返回 413，无法识别的文件类型返回 415
+    """
+    try:
+        return _read_source()
+    except RequestEntityTooLarge:
+        return None, None, (jsonify({"error": "file_too_large", "max_bytes": upload_store.MAX_CONTENT_LENGTH}), 413)
+
+
+def _read_source():
+    mode = None
+    if request.is_json:
+        mode = request.json.get("mode")
+    elif "mode" in request.form:
+        mode = request.form.get("mode")
+
+    if mode == "text":
+        text = request.json.get("text", "").strip()
+        if not text:
+            return None, None, (jsonify({"error": "empty_text"}), 400)
+        return text, SOURCE_TEXT, None
+
+    if mode == "file":
+        if "file" not in request.files:
+            return None, None, (jsonify({"error": "missing_file"}), 400)
+        file = request.files["file"]
+        try:
+            save_path, _ = upload_store.save_upload(file.stream)
+        except upload_store.UnsupportedUpload:
+            return None, None, (jsonify({"error": "unsupported_file_type"}), 415)
+        return save_path, SOURCE_FILE, None
+
+    return None, None, (jsonify({"error": "invalid_mode"}), 400)
+
+
+def _local_only():
+    """local_only=true 时只做本地词库精确匹配，不调用模型；缺省交给服务端按文本长度 / 模型可用性决定"""
+    v = request.json.get("local_only") if request.is_json else request.form.get("local_only")
+    if v is None or v == "":
+        return None
+    return v is True or str(v).lower() in ("1", "true", "yes")
+
+
+def _public(result):
+    """识别结果 → 接口字段"""
+    return {
+        "tech": result.get("key_tech_found", []),
+        "product": result.get("key_products_found", []),
+        "raw_tech": result.get("all_tech_words", []),
+        "raw_product": result.get("all_product_words", []),
+    }
+
+
 # ---------- API：智发现 ----------
 @discover_bp.post("/api/identify")
 def api_identify():
+    """智发现接口：支持文本和文件两种模式（参数见 _read_request）"""
+    try:
+        source, kind, err = _read_request()
+        if err:
+            return err
+        return jsonify(_public(intelligent_discovery(source, local_only=_local_only(), kind=kind)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@discover_bp.post("/api/identify/stream")
+def api_identify_stream():
     """
-    智发现接口：支持文本和文件两种模式
-    mode='text' 传 JSON {mode:'text', text:'...'}
-    mode='file' 上传 FormData {mode:'file', file:...}
+    流式智发现：参数同 /api/identify，响应为 NDJSON（每行一个 JSON 事件）
+    {"event":"start","local_only":..}                 开始解析输入前推送
+    {"event":"chunk","index":..,"done":..,"chunks":..,"tech":[..],"product":[..],...}  每块完成即推送；
+                                                       输入还在解析时 chunks 为已提交的块数
+    {"event":"progress","chars":..,"chunks":..}      输入解析完毕，chunks 为最终块数
+    {"event":"local","tech":[..],"product":[..],...}  词库名称在原文中的直接命中，不等模型
+    {"event":"done","tech":[..],"product":[..],"raw_tech":[..],"raw_product":[..]}    合并后的最终结果
+    出错时推送 {"event":"error","error":"..."} 后结束
+    """
+    try:
+        source, kind, err = _read_request()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if err:
+        return err
+    local_only = _local_only()
+
+    def generate():
+        try:
+            for ev in iter_discovery(source, local_only=local_only, kind=kind):
+                if ev["event"] in ("local", "chunk", "done"):
+                    ev = {k: v for k, v in ev.items() if k in ("event", "index", "done", "chunks")} | _public(ev)
+                yield json.dumps(ev, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ---------- API：识别任务（异步） ----------
+@discover_bp.post("/api/identify/jobs")
+def api_identify_job_submit():
+    """
+    提交识别任务：参数同 /api/identify，立即返回 202 {job_id, status, status_url}
+    排队已满返回 429（带 Retry-After），稍后重试
     """
     try:
-        mode = None
-        if request.is_json:
-            mode = request.json.get("mode")
-        elif "mode" in request.form:
-            mode = request.form.get("mode")
-
-        if mode == "text":
-            text = request.json.get("text", "").strip()
-            if not text:
-                return jsonify({"error": "empty_text"}), 400
-            result = intelligent_discovery(text, "data")
-
-        elif mode == "file":
-            if "file" not in request.files:
-                return jsonify({"error": "missing_file"}), 400
-            file = request.files["file"]
-            save_path = os.path.join("static", "uploads", file.filename)
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            file.save(save_path)
-            result = intelligent_discovery(save_path, "/app/data")
-
-        else:
-            return jsonify({"error": "invalid_mode"}), 400
-
-        return jsonify({
-            "tech": result.get("key_tech_found", []),
-            "product": result.get("key_products_found", []),
-            "raw_tech": result.get("all_tech_words", []),
-            "raw_product": result.get("all_product_words", []),
-        })
+        source, kind, err = _read_request()
+        if err:
+            return err
+        job_id = get_job_queue().submit(source, local_only=_local_only(), kind=kind)
+    except QueueFull:
+        resp = jsonify({"error": "queue_full"})
+        resp.headers["Retry-After"] = "5"
+        return resp, 429
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    return jsonify({"job_id": job_id, "status": "queued",
+                    "status_url": f"/api/identify/jobs/{job_id}"}), 202
+
+
+@discover_bp.get("/api/identify/jobs/<job_id>")
+def api_identify_job_status(job_id):
+    """任务状态：queued / running / done / error / timeout；done 时 result 字段同 /api/identify"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "not_found"}), 404
+    if job["result"] is not None:
+        job["result"] = _public(job["result"])
+    return jsonify(job)